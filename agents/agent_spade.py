@@ -1,45 +1,67 @@
 import asyncio
 import sys
-from spade.agent import Agent
-from spade.behaviour import OneShotBehaviour, CyclicBehaviour
-from spade.message import Message
 
+# spade (and its XMPP stack) is slow to import, so the agent classes are
+# built on first use instead of at module import time.
+_classes = None
 
-class ReceiverAgent(Agent):
-    class RecvBehav(CyclicBehaviour):
-        async def run(self):
-            msg = await self.receive(timeout=3)  # short timeout
-            if msg:
+
+def _build_agents():
+    """Import spade and define ReceiverAgent / SenderAgent."""
+    from spade.agent import Agent
+    from spade.behaviour import OneShotBehaviour, CyclicBehaviour
+    from spade.message import Message
+
+    class ReceiverAgent(Agent):
+        class RecvBehav(CyclicBehaviour):
+            async def run(self):
+                msg = await self.receive(timeout=3)  # short timeout
+                if msg:
           
-                sender_jid = getattr(msg.sender, 'bare', None) or str(msg.sender).split('/')[0]
-                print(f"[Receiver] Got message from {sender_jid}: {msg.body}")
+                    sender_jid = getattr(msg.sender, 'bare', None) or str(msg.sender).split('/')[0]
+                    print(f"[Receiver] Got message from {sender_jid}: {msg.body}")
            
-            await self.agent.stop()
+                await self.agent.stop()
+
+        async def setup(self):
+            print("[Receiver] Starting")
+            self.add_behaviour(self.RecvBehav())
+
+    class SenderAgent(Agent):
+        class SendBehav(OneShotBehaviour):
+            async def run(self):
+                msg = Message(to="bob@localhost")
+                msg.body = "Hello from alice!"
+                await self.send(msg)
+                print("[Sender] Message sent")
+                # Stop after sending
+                await self.agent.stop()
+
+        async def setup(self):
+            print("[Sender] Starting")
+            self.add_behaviour(self.SendBehav())
+
+    return {"ReceiverAgent": ReceiverAgent, "SenderAgent": SenderAgent}
 
-    async def setup(self):
-        print("[Receiver] Starting")
-        self.add_behaviour(self.RecvBehav())
 
+def _agent_classes():
+    global _classes
+    if _classes is None:
+        _classes = _build_agents()
+    return _classes
 
-class SenderAgent(Agent):
-    class SendBehav(OneShotBehaviour):
-        async def run(self):
-            msg = Message(to="bob@localhost")
-            msg.body = "Hello from alice!"
-            await self.send(msg)
-            print("[Sender] Message sent")
-            # Stop after sending
-            await self.agent.stop()
 
-    async def setup(self):
-        print("[Sender] Starting")
-        self.add_behaviour(self.SendBehav())
+def __getattr__(name):
+    # `from agents.agent_spade import ReceiverAgent` keeps working
+    if name in ("ReceiverAgent", "SenderAgent"):
+        return _agent_classes()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 async def main():
-  
-    receiver = ReceiverAgent("bob@localhost", "secret2")
-    sender = SenderAgent("alice@localhost", "secret1")
+    classes = _agent_classes()
+    receiver = classes["ReceiverAgent"]("bob@localhost", "secret2")
+    sender = classes["SenderAgent"]("alice@localhost", "secret1")
 
     try:
        
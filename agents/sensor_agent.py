@@ -1,58 +1,112 @@
 import asyncio
 import logging
-from logging.handlers import RotatingFileHandler
 from typing import Optional
 
+from sim_clock import Clock, REAL_CLOCK
+from event_queues import BatchSizeStats, get_batch, make_event_queue
+
 
 DEFAULT_LOGFILE = "disaster_events.log"
+EVENT_FORMAT = "EVENT type=%s severity=%s location=%s id=%s"
 
 
-def setup_logger(logfile: str = DEFAULT_LOGFILE) -> logging.Logger:
+def setup_logger(logfile: str = DEFAULT_LOGFILE, console: bool = True,
+                 async_mode: bool = False) -> logging.Logger:
     logger = logging.getLogger("sensor_agent")
     logger.setLevel(logging.INFO)
     if not logger.handlers:
+        from logging.handlers import RotatingFileHandler
+        from log_pipeline import attach_handlers
+
         handler = RotatingFileHandler(logfile, maxBytes=100_000, backupCount=2)
         fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
         handler.setFormatter(fmt)
-        logger.addHandler(handler)
-        ch = logging.StreamHandler()
-        ch.setFormatter(fmt)
-        logger.addHandler(ch)
+        handlers = [handler]
+        if console:
+            ch = logging.StreamHandler()
+            ch.setFormatter(fmt)
+            handlers.append(ch)
+        attach_handlers(logger, handlers, async_mode=async_mode)
     return logger
 
 
 class SensorAgent:
-    def __init__(self, queue: asyncio.Queue, logger: Optional[logging.Logger] = None):
+    def __init__(self, queue: asyncio.Queue, logger: Optional[logging.Logger] = None,
+                 clock: Optional[Clock] = None, echo: bool = True, metrics=None):
+        """echo: print each detection to stdout as well as logging it.
+        metrics: optional response_metrics.Metrics registry"""
         self.queue = queue
         self.logger = logger or setup_logger()
+        self.clock = clock or REAL_CLOCK
+        self.echo = echo
+        self.metrics = metrics
+        self.batch_stats = BatchSizeStats()
         self.running = False
 
     async def monitor_once(self, timeout: float = 1.0):        
         try:
             ev = await asyncio.wait_for(self.queue.get(), timeout)
-           
-            self.logger.info(f"EVENT type={ev['type']} severity={ev['severity']} location={ev['location']} id={ev['id']}")
-            
-            print(f"[Sensor] Detected {ev['type']} severity={ev['severity']} at {ev['location']}")
+            self._observe_dequeue(ev)
+
+            self.logger.info(EVENT_FORMAT, ev["type"], ev["severity"], ev["location"], ev["id"])
+
+            if self.echo:
+                print(f"[Sensor] Detected {ev['type']} severity={ev['severity']} at {ev['location']}")
             return ev
         except asyncio.TimeoutError:
-            
+            if self.metrics is not None:
+                self.metrics.inc("agent_timeouts_total", agent="sensor")
             return None
 
-    async def monitor(self, cycles: int = 10, timeout: float = 0.5):
+    def _observe_dequeue(self, ev) -> None:
+        if self.metrics is not None:
+            self.metrics.observe("queue_wait_seconds", self.clock.time() - ev["timestamp"], agent="sensor")
+            self.metrics.set_gauge("consumer_queue_depth", self.queue.qsize(), agent="sensor")
+
+    async def monitor_batch(self, max_batch: int = 64, timeout: float = 1.0) -> list:
+        """Take up to `max_batch` ready events and log them in one record."""
+        events = await get_batch(self.queue, max_batch, timeout)
+        if not events:
+            if self.metrics is not None:
+                self.metrics.inc("agent_timeouts_total", agent="sensor")
+            return events
+        self.batch_stats.record(len(events))
+        for ev in events:
+            self._observe_dequeue(ev)
+        args = []
+        for ev in events:
+            args += (ev["type"], ev["severity"], ev["location"], ev["id"])
+        # one record, one line per event; formatting still deferred
+        self.logger.info("\n".join([EVENT_FORMAT] * len(events)), *args)
+        if self.echo:
+            print("\n".join(f"[Sensor] Detected {ev['type']} severity={ev['severity']} at {ev['location']}"
+                            for ev in events))
+        return events
+
+    async def monitor(self, cycles: int = 10, timeout: float = 0.5, batch_size: int = 1):
+        """batch_size > 1 drains up to that many ready events per cycle."""
         self.running = True
         for _ in range(cycles):
-            await self.monitor_once(timeout=timeout)
+            if batch_size > 1:
+                await self.monitor_batch(batch_size, timeout=timeout)
+            else:
+                await self.monitor_once(timeout=timeout)
         self.running = False
 
 
-async def demo_run(duration: float = 5.0):
+async def demo_run(duration: float = 5.0, clock: Optional[Clock] = None, queue_mode: str = "fifo",
+                   queue_size: int = 0, overflow: str = "block"):
+    """Demo: Environment -> SensorAgent.
 
+    Pass a VirtualClock (and run via clock.run) to fast-forward the demo;
+    the queue options are those of disaster_response_agent.demo_run.
+    """
     from disaster_environment import Environment
 
-    q = asyncio.Queue()
-    env = Environment(seed=1, base_probability=0.4)
-    sensor = SensorAgent(q)
+    bounds = {"maxsize": queue_size, "overflow": overflow} if queue_size else {}
+    q = make_event_queue(queue_mode, clock=clock, **bounds)
+    env = Environment(seed=1, base_probability=0.4, clock=clock)
+    sensor = SensorAgent(q, clock=clock)
 
     
     env_task = asyncio.create_task(env.run(q, interval=0.5, duration=duration))
@@ -0,0 +1,384 @@
+"""Benchmark suite for the environment -> agent pipeline
+
+Standalone CLI; results are written as JSON so runs on different commits
+can be compared:
+
+  python benchmark.py --output bench.json
+  python benchmark.py --quick --compare bench.json
+  python benchmark.py --measure-startup
+
+Benchmarks:
+  env_generate_event    Environment.generate_event calls/sec
+  env_generate_columns  Environment.generate_columns events/sec
+  event_memory          bytes allocated per dict event vs compact Event
+  fsm_handle_event      FSM / CompiledFSM handle_event ops/sec
+  goalset_scaling       GoalSet add / status change / query cost at 1k..1M goals
+  incident_scheduling   cost per incident with 1k..100k incidents in flight,
+                        coroutine per incident vs. TimerWheel
+  end_to_end            events/sec and p50/p99 latency through
+                        DisasterResponseAgent (VirtualClock, latency in
+                        simulated seconds from event timestamp to done)
+  overload_by_severity  the same pipeline driven past capacity, FIFO vs
+                        priority queue, with p50/p99 latency per severity
+  overload_bounded      the overload run on a bounded queue per overflow
+                        policy, with events shed
+
+--measure-startup instead times a fresh interpreter importing each agent
+entry point (python -X importtime) and lists the modules that cost most.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Sequence
+
+from disaster_environment import Environment
+from response_fsm import build_disaster_response_fsm
+from response_goals import Goal, GoalSet, GoalStatus, GoalType
+
+
+def _best_of(fn: Callable[[], None], repeat: int = 3) -> float:
+    """Fastest wall time of `repeat` runs of fn()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def quiet_logger() -> logging.Logger:
+    logger = logging.getLogger("response_agent.benchmark")
+    logger.propagate = False
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def bench_env_generate_event(n: int) -> Dict:
+    env = Environment(seed=1, base_probability=1.0)
+    seconds = _best_of(lambda: [env.generate_event() for _ in range(n)])
+    return {"events": n, "seconds": seconds, "events_per_sec": n / seconds}
+
+
+def bench_env_generate_columns(n: int) -> Dict:
+    env = Environment(seed=1, base_probability=0.5)
+    seconds = _best_of(lambda: env.generate_columns(n, start=0.0))
+    return {"events": n, "seconds": seconds, "events_per_sec": n / seconds}
+
+
+def bench_event_memory(n: int) -> Dict:
+    """Allocated bytes per event for dict events vs compact Event objects."""
+    import tracemalloc
+
+    results = {}
+    for name, compact in (("dict", False), ("compact", True)):
+        env = Environment(seed=1, base_probability=1.0, compact=compact)
+        tracemalloc.start()
+        events = [env.generate_event() for _ in range(n)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {"bytes_per_event": size / len(events)}
+    return results
+
+
+def bench_fsm_handle_event(cycles: int) -> Dict:
+    script = ["event_detected", "assess_damage", "damage_confirmed", "goal_complete", "recovery_done"]
+    results = {}
+    for name, fsm in (("fsm", build_disaster_response_fsm(history_limit=1000)),
+                      ("compiled", build_disaster_response_fsm(history_limit=1000).compile())):
+        def run():
+            handle = fsm.handle_event
+            for _ in range(cycles):
+                for event in script:
+                    handle(event)
+        seconds = _best_of(run)
+        results[name] = {"ops": cycles * len(script), "ops_per_sec": cycles * len(script) / seconds}
+    return results
+
+
+def bench_goal_ops(n: int) -> Dict:
+    """Per-goal cost of construction and of indexed vs plain field writes."""
+    construct = _best_of(lambda: [Goal(GoalType.RESCUE, "Nima", 3, event_id=i) for i in range(n)])
+    gs = GoalSet()
+    goal = Goal(GoalType.RESCUE, "Nima", 3, status=GoalStatus.ACTIVE)
+    gs.add_goal(goal)
+
+    def set_priority():
+        for i in range(n):
+            goal.priority = 1 + i % 5
+
+    def set_location():
+        for _ in range(n):
+            goal.location = "Circle"
+
+    return {
+        "construct_us": construct / n * 1e6,
+        "set_priority_us": _best_of(set_priority) / n * 1e6,
+        "set_location_us": _best_of(set_location) / n * 1e6,
+    }
+
+
+def bench_goalset_scaling(sizes: List[int]) -> Dict:
+    results = {}
+    for size in sizes:
+        gs = GoalSet()
+        goals = [Goal(GoalType.RESCUE, "Nima", 1 + i % 5, event_id=str(i)) for i in range(size)]
+        start = time.perf_counter()
+        for g in goals:
+            gs.add_goal(g)
+        add = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for g in goals:
+            g.status = GoalStatus.ACTIVE
+        activate = time.perf_counter() - start
+
+        # steady state: most goals finished, a handful active
+        for g in goals[:-100]:
+            gs.mark_completed(g)
+        probes = 1000
+        query = _best_of(lambda: [gs.get_active_goals() for _ in range(probes)]) / probes
+        lookup = _best_of(lambda: [gs.get_by_event_id(str(i)) for i in range(probes)]) / probes
+        results[str(size)] = {
+            "add_us": add / size * 1e6,
+            "status_change_us": activate / size * 1e6,
+            "get_active_goals_us": query * 1e6,
+            "lookup_event_id_us": lookup * 1e6,
+        }
+    return results
+
+
+def bench_end_to_end(duration: float, workers: int = 1, queue_mode: str = "fifo",
+                     base_probability: float = 0.3, **queue_kwargs) -> Dict:
+    import asyncio
+    from disaster_response_agent import DisasterResponseAgent
+    from event_queues import make_event_queue
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+    latencies: List[float] = []
+    by_severity: Dict[int, List[float]] = {}
+    queues: List = [None]
+
+    class TimedAgent(DisasterResponseAgent):
+        async def process_event(self, event_data, fsm=None):
+            await super().process_event(event_data, fsm)
+            latency = self.clock.time() - event_data["timestamp"]
+            latencies.append(latency)
+            by_severity.setdefault(event_data["severity"], []).append(latency)
+
+    async def pipeline():
+        q = queues[0] = make_event_queue(queue_mode, clock=clock, **queue_kwargs)
+        env = Environment(seed=7, base_probability=base_probability, clock=clock)
+        agent = TimedAgent("Bench-1", q, logger=quiet_logger(), clock=clock,
+                           retention=1000, workers=workers)
+        interval = 0.1
+        await asyncio.gather(
+            env.run(q, interval=interval, duration=duration),
+            agent.run(cycles=int(duration / interval) + 3, timeout=interval + 0.05),
+        )
+
+    start = time.perf_counter()
+    clock.run(pipeline())
+    wall = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "events": len(latencies),
+        "wall_seconds": wall,
+        "events_per_sec": len(latencies) / wall if wall else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p99": percentile(latencies, 99),
+        "dropped": getattr(queues[0], "dropped", 0),
+        "latency_by_severity": {
+            str(sev): {"events": len(values), "p50": percentile(values, 50), "p99": percentile(values, 99)}
+            for sev, values in sorted(by_severity.items())
+        },
+    }
+
+
+def bench_incident_scheduling(sizes: List[int]) -> Dict:
+    """Wall time per incident with n incidents open at once, one
+    coroutine + asyncio timers each vs. a shared TimerWheel."""
+    import asyncio
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+    from timer_wheel import TimerWheel
+
+    results = {}
+    for n in sizes:
+        events = Environment(seed=1, base_probability=1.0, compact=True).generate_events(n, start=0.0)
+        for ev in events:
+            ev.severity = 5  # every incident runs all three phases
+        row = {}
+        for mode in ("coroutines", "wheel"):
+            clock = VirtualClock()
+            q = asyncio.Queue()
+            for ev in events:
+                q.put_nowait(ev)
+            wheel = TimerWheel(clock=clock) if mode == "wheel" else None
+            agent = DisasterResponseAgent("Bench-1", q, logger=quiet_logger(), clock=clock,
+                                          retention=0, workers=n, wheel=wheel)
+            start = time.perf_counter()
+            clock.run(agent.run(cycles=n, timeout=0.5))
+            row[f"{mode}_us_per_incident"] = (time.perf_counter() - start) / n * 1e6
+        results[str(n)] = row
+    return results
+
+
+def run_all(quick: bool = False) -> Dict:
+    scale = 10 if quick else 1
+    goal_sizes = [1_000, 10_000, 100_000] if quick else [1_000, 10_000, 100_000, 1_000_000]
+    return {
+        "env_generate_event": bench_env_generate_event(100_000 // scale),
+        "env_generate_columns": bench_env_generate_columns(1_000_000 // scale),
+        "event_memory": bench_event_memory(100_000 // scale),
+        "fsm_handle_event": bench_fsm_handle_event(100_000 // scale),
+        "goal_ops": bench_goal_ops(200_000 // scale),
+        "goalset_scaling": bench_goalset_scaling(goal_sizes),
+        "incident_scheduling": bench_incident_scheduling([1_000, 10_000] if quick else [1_000, 10_000, 100_000]),
+        "end_to_end": {
+            "sequential": bench_end_to_end(3600.0 / scale),
+            "workers_8": bench_end_to_end(3600.0 / scale, workers=8),
+        },
+        # ~6 arrivals/sec against ~4/sec of service capacity
+        "overload_by_severity": {
+            mode: bench_end_to_end(600.0 / scale, queue_mode=mode, base_probability=0.6)
+            for mode in ("fifo", "priority")
+        },
+        # same overload with a 32-slot queue: memory stays flat, events are shed
+        "overload_bounded": {
+            policy: bench_end_to_end(600.0 / scale, queue_mode="priority", base_probability=0.6,
+                                     maxsize=32, overflow=policy)
+            for policy in ("drop_lowest", "drop_oldest", "sample")
+        },
+    }
+
+
+STARTUP_MODULES = ("disaster_response_agent", "agents.sensor_agent", "agents.agent_spade",
+                   "demo_simulation", "parallel_launcher")
+
+
+def _parse_importtime(stderr: str) -> List[Dict]:
+    """Rows of `python -X importtime` output as dicts (times in ms)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return rows
+
+
+def measure_startup(modules: Sequence[str] = STARTUP_MODULES, repeat: int = 5, top: int = 8) -> Dict:
+    """Import time of each module in a fresh interpreter, best of `repeat`.
+
+    import_ms sums the top-level imports (everything the module pulls
+    in); top lists the costliest modules by self time.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in ("",) + tuple(modules):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                                   f"import {module}" if module else "pass"],
+                                  cwd=here, capture_output=True, text=True)
+            wall = time.perf_counter() - start
+            rows = _parse_importtime(proc.stderr)
+            run = {
+                "wall_ms": wall * 1000,
+                "import_ms": sum(r["cumulative_ms"] for r in rows if r["depth"] == 0),
+                "ok": proc.returncode == 0,
+                "top": sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top],
+            }
+            if best is None or run["wall_ms"] < best["wall_ms"]:
+                best = run
+        results[module or "(interpreter)"] = best
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current: Dict, baseline: Dict) -> List[str]:
+    """Lines of `metric: baseline -> current (ratio)` for shared metrics."""
+    now, then = _flatten(current["results"]), _flatten(baseline["results"])
+    lines = []
+    for name in sorted(now.keys() & then.keys()):
+        ratio = now[name] / then[name] if then[name] else float("inf")
+        lines.append(f"{name}: {then[name]:.4g} -> {now[name]:.4g} (x{ratio:.2f})")
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the disaster response pipeline")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast run")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--measure-startup", action="store_true",
+                        help="only measure import time of the agent entry points")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "quick": args.quick,
+        },
+        "results": (measure_startup(repeat=3 if args.quick else 5) if args.measure_startup
+                    else run_all(quick=args.quick)),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            for line in compare(report, json.load(fh)):
+                print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""Checkpoint and restore of DisasterResponseAgent state
+
+A checkpoint file is a sequence of length-prefixed pickle frames:
+
+  frame 0     base: every live goal, the full FSM history and all counters
+  frame 1..n  deltas: only goals added/changed/evicted since the previous
+              frame, the FSM history appended since then, and counters
+
+Checkpointer snapshots on the event loop thread, which gives a consistent
+cut because nothing else mutates agent state. A snapshot only copies
+what changed into plain tuples and dicts; pickling and the file write
+happen in order on a single-worker executor, and run() does not wait
+for them, so neither the loop nor the snapshot schedule blocks on
+encoding or disk. Every `full_every` snapshots a fresh base replaces
+the file (written to a temp file and renamed), which bounds restore
+time.
+
+Restoring folds base + deltas back into the agent (a torn final frame
+from a crash mid-write is ignored). Events that were dequeued but not
+finished at snapshot time go back on the queue, followed by the journal
+tail from JournalReader.iter_from(events_dequeued):
+
+  agent = DisasterResponseAgent("A", queue, clock=clock)
+  resume(agent, "agent.ckpt", journal_path="events.evj")
+
+In-flight incidents restart from the beginning (at-least-once). Goals
+they had opened are marked FAILED as interrupted. The journal offset
+assumes the agent consumes the journaled stream in order, i.e. a single
+agent on a FIFO queue.
+"""
+
+import asyncio
+import os
+import pickle
+import struct
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from itertools import islice
+from operator import attrgetter
+from typing import Dict, List, Optional
+
+from response_fsm import State
+from response_goals import Goal, GoalSet, GoalStatus, GoalType
+
+FRAME = struct.Struct("<I")  # payload length
+PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+# a goal as captured on the loop; the enums are turned into values by the writer
+_goal_fields = attrgetter("_seq", "goal_type", "location", "priority", "status", "event_id",
+                          "created_at")
+
+
+def _goal_records(captured: List[tuple]) -> List[tuple]:
+    # _value_ is the plain attribute behind the (much slower) .value property
+    return [(seq, goal_type._value_, location, priority, status._value_, event_id, created_at)
+            for seq, goal_type, location, priority, status, event_id, created_at in captured]
+
+
+def _states(counter: Counter) -> Dict[str, float]:
+    return {state.value: n for state, n in counter.items()}
+
+
+class Checkpointer:
+    """Periodic incremental snapshots of one agent.
+
+    path: checkpoint file
+    interval: seconds (on the agent's clock) between snapshots in run()
+    full_every: write a new base instead of a delta every N snapshots
+    executor: where file writes run; must run jobs in submission order
+              (default: a private single-worker thread pool)
+    fsync: fsync after each write for durability across power loss
+    """
+
+    def __init__(self, agent, path: str, interval: float = 5.0, full_every: int = 50,
+                 executor: Optional[Executor] = None, fsync: bool = False):
+        self.agent = agent
+        self.path = path
+        self.interval = interval
+        self.full_every = max(1, full_every)
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(1, thread_name_prefix="checkpoint")
+        self.fsync = fsync
+        self.snapshots = 0
+        self.bytes_written = 0
+        self._since_base = 0
+        self._fsm_mark = 0  # fsm.transition_count at the previous snapshot
+        agent.goals.track_changes()
+
+    def snapshot(self) -> tuple:
+        """Capture the next frame as plain data; returns (state, is_base).
+
+        Must run on the event loop thread. The state shares nothing
+        mutable with the agent, so it can be encoded on another thread.
+        """
+        agent = self.agent
+        base = self.snapshots == 0 or self._since_base >= self.full_every
+        fsm = agent.fsm
+        new = fsm.transition_count - self._fsm_mark
+        if base or new >= len(fsm.history):
+            history, replace = list(fsm.history), True
+        else:
+            history, replace = list(islice(fsm.history, len(fsm.history) - new, None)), False
+        changed, removed = agent.goals.take_changes()
+        if base:
+            changed, removed = agent.goals.goals, []
+        state = {
+            "kind": "base" if base else "delta",
+            "time": agent.clock.time(),
+            "agent": {
+                "events_processed": agent.events_processed,
+                "events_dequeued": agent.events_dequeued,
+                "incident_transitions": agent.incident_transitions,
+                "incident_state_counts": _states(agent.incident_state_counts),
+                "state_dwell": _states(agent.state_dwell),
+                "in_flight": [dict(ev) for ev in agent.in_flight.values()],
+            },
+            "fsm": {
+                "current_state": fsm.current_state.value,
+                "history": [s.value for s in history],
+                "history_replace": replace,
+                "transition_count": fsm.transition_count,
+                "state_counts": _states(fsm.state_counts),
+                "archived": fsm._archived,
+            },
+            "goals": list(map(_goal_fields, changed)),
+            "removed": removed,
+            "goal_counters": agent.goals.export_counters(),
+        }
+        self._fsm_mark = fsm.transition_count
+        self.snapshots += 1
+        self._since_base = 1 if base else self._since_base + 1
+        return state, base
+
+    def checkpoint(self) -> asyncio.Future:
+        """Take a snapshot now and queue its write.
+
+        Returns a future for the write; await it to know it is on disk.
+        """
+        state, base = self.snapshot()
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, self._write, state, base)
+
+    def _write(self, state: Dict, base: bool) -> None:
+        state["goals"] = _goal_records(state["goals"])
+        payload = pickle.dumps(state, protocol=PROTOCOL)
+        frame = FRAME.pack(len(payload)) + payload
+        if base:
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(frame)
+                if self.fsync:
+                    os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+        else:
+            with open(self.path, "ab") as fh:
+                fh.write(frame)
+                if self.fsync:
+                    os.fsync(fh.fileno())
+        self.bytes_written += len(frame)
+
+    async def run(self, duration: Optional[float] = None) -> None:
+        """Checkpoint every `interval` seconds (for `duration`, or until
+        cancelled), plus once more on the way out, however run() exits."""
+        clock = self.agent.clock
+        start = clock.time()
+        write = None
+        try:
+            while duration is None or clock.time() - start < duration:
+                await clock.sleep(self.interval)
+                if write is not None and write.done():
+                    write.result()  # surface I/O errors
+                write = self.checkpoint()
+        finally:
+            await self.checkpoint()
+
+    def close(self) -> None:
+        """Wait for queued writes and release the default executor."""
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+
+def read_frames(path: str) -> List[Dict]:
+    """Decode every complete frame in a checkpoint file."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    frames, offset = [], 0
+    while offset + FRAME.size <= len(data):
+        (size,) = FRAME.unpack_from(data, offset)
+        end = offset + FRAME.size + size
+        if end > len(data):
+            break  # torn write
+        frames.append(pickle.loads(data[offset + FRAME.size:end]))
+        offset = end
+    return frames
+
+
+def load_checkpoint(path: str) -> Dict:
+    """Fold the base and deltas of `path` into one state dict."""
+    frames = read_frames(path)
+    if not frames or frames[0]["kind"] != "base":
+        raise ValueError(f"{path}: no base snapshot")
+    goals: Dict[int, tuple] = {}
+    history: List[str] = []
+    state = {}
+    for frame in frames:
+        for record in frame["goals"]:
+            goals[record[0]] = record
+        for seq in frame["removed"]:
+            goals.pop(seq, None)
+        fsm = frame["fsm"]
+        history = fsm["history"] if fsm["history_replace"] else history + fsm["history"]
+        state = frame
+    state = dict(state, goals=[goals[seq] for seq in sorted(goals)])
+    state["fsm"] = dict(state["fsm"], history=history)
+    return state
+
+
+def restore(agent, state: Dict) -> List[dict]:
+    """Apply a load_checkpoint() state to a freshly built `agent`.
+
+    Returns the events that were in flight at snapshot time.
+    """
+    fsm = state["fsm"]
+    limit = agent.fsm.history_limit
+    history = [State(s) for s in fsm["history"]]
+    if limit is not None:
+        history = history[-limit:]
+    in_flight = state["agent"]["in_flight"]
+    current = State(fsm["current_state"])
+    if in_flight:
+        current = State.IDLE  # interrupted incidents are restarted
+    agent.fsm.restore_state(current, history, fsm["transition_count"],
+                            Counter({State(k): n for k, n in fsm["state_counts"].items()}),
+                            fsm["archived"])
+
+    old = agent.goals
+    goals = GoalSet(max_terminal=old.max_terminal, archive=old.archive)
+    if old._changed is not None:
+        # a Checkpointer attached before the restore keeps seeing changes
+        goals.track_changes()
+    types = {t.value: t for t in GoalType}
+    statuses = {s.value: s for s in GoalStatus}
+    for seq, goal_type, location, priority, status, event_id, created_at in state["goals"]:
+        goal = Goal(types[goal_type], location, priority, statuses[status], event_id, created_at)
+        goals.add_goal(goal, seq=seq)
+    goals.restore_counters(state["goal_counters"])
+    interrupted = {ev["id"] for ev in in_flight}
+    for goal in goals.get_by_status(GoalStatus.ACTIVE):
+        if goal.event_id in interrupted:
+            goals.mark_failed(goal)
+    agent.goals = goals
+
+    counts = state["agent"]
+    # interrupted events were counted when first processed, and will be again
+    agent.events_processed = counts["events_processed"] - len(in_flight)
+    agent.events_dequeued = counts["events_dequeued"] - len(in_flight)
+    agent.incident_transitions = counts["incident_transitions"]
+    agent.incident_state_counts = Counter({State(k): n for k, n in counts["incident_state_counts"].items()})
+    agent.state_dwell = Counter({State(k): n for k, n in counts["state_dwell"].items()})
+    return in_flight
+
+
+def resume(agent, path: str, journal_path: Optional[str] = None) -> int:
+    """Restore `agent` from `path` and queue the work still to do: events
+    that were in flight, then the journal tail. Returns events queued."""
+    state = load_checkpoint(path)
+    pending = restore(agent, state)
+    for event in pending:
+        agent.queue.put_nowait(event)
+    queued = len(pending)
+    if journal_path is not None:
+        from event_journal import JournalReader
+
+        with JournalReader(journal_path) as reader:
+            for event in reader.iter_from(state["agent"]["events_dequeued"]):
+                agent.queue.put_nowait(event)
+                queued += 1
+    return queued
@@ -6,21 +6,34 @@ pursuing goals.
 """
 
 import asyncio
-import logging
-from disaster_response_agent import DisasterResponseAgent, demo_run
-from disaster_environment import Environment
+import sys
+from typing import TYPE_CHECKING, Optional
 
+if TYPE_CHECKING:
+    from sim_clock import Clock
+
+# The agent stack is imported inside the functions that use it, so the
+# unit-test functions below load only the module they exercise.
+
+
+async def traced_execution(clock: Optional["Clock"] = None, queue_mode: str = "fifo"):
+    """Run a detailed execution trace showing agent behavior.
+
+    clock: pass a VirtualClock to run the trace in simulated time
+    queue_mode: "fifo" or "priority" (severe events jump the line)
+    """
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from event_queues import make_event_queue
 
-async def traced_execution():
-    """Run a detailed execution trace showing agent behavior."""
     print("\n" + "="*60)
     print("DISASTER RESPONSE SYSTEM - GHANA")
     print("Monitoring and responding to emergencies")
     print("="*60 + "\n")
 
-    q = asyncio.Queue()
-    env = Environment(seed=99, base_probability=0.6)
-    agent = DisasterResponseAgent("Agent-1", q)
+    q = make_event_queue(queue_mode, clock=clock)
+    env = Environment(seed=99, base_probability=0.6, clock=clock)
+    agent = DisasterResponseAgent("Agent-1", q, clock=clock)
 
     print(f"Agent: {agent.agent_id}")
     print(f"Status: Ready")
@@ -34,7 +47,7 @@ async def traced_execution():
 
     print(f"\n--- Summary ---")
     print(f"Final Status: {agent.fsm.current_state.value}")
-    print(f"Total Actions: {len(agent.goals.goals)}")
+    print(f"Total Actions: {agent.goals.total_added}")
     
     if agent.goals.goals:
         print(f"\nActions Taken:")
@@ -99,5 +112,11 @@ if __name__ == "__main__":
     test_goal_creation()
     print()
 
-    # Run full execution trace
-    asyncio.run(traced_execution())
+    # Run full execution trace (--fast replays it in simulated time)
+    if "--fast" in sys.argv:
+        from sim_clock import VirtualClock
+
+        clock = VirtualClock()
+        clock.run(traced_execution(clock))
+    else:
+        asyncio.run(traced_execution())
@@ -1,8 +1,8 @@
 import asyncio
 import random
-import time
-import uuid
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict, Iterator, List, Sequence
+
+from sim_clock import Clock, REAL_CLOCK
 
 EVENT_TYPES = ["earthquake", "flood", "fire", "stampede", "wind", "landslide"]
 LOCATIONS = [
@@ -14,19 +14,111 @@ LOCATIONS = [
     "Kantamanto",
     "Nima",
 ]
+TYPE_CODES = {t: i for i, t in enumerate(EVENT_TYPES)}
+LOCATION_CODES = {loc: i for i, loc in enumerate(LOCATIONS)}
+
+
+def import_numpy(feature: str):
+    """Import NumPy, which only the bulk/vectorized paths (`feature`) need."""
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImportError(f"{feature} needs NumPy, which is not installed (pip install numpy)") from exc
+    return numpy
+
+
+class Event:
+    """Compact event record with the same keys as the event dict.
+
+    Type and location are stored as small integer codes into EVENT_TYPES /
+    LOCATIONS and the id is an int, so an event is five slots instead of
+    a dict plus a 36-character UUID string. Read access works like the
+    dict: ev["type"], ev.get("id"), dict(ev) and ev.to_dict().
+    """
+    __slots__ = ("id", "type_code", "severity", "location_code", "timestamp")
+    KEYS = ("id", "type", "severity", "location", "timestamp")
+
+    def __init__(self, id: int, type_code: int, severity: int, location_code: int, timestamp: float):
+        self.id = id
+        self.type_code = type_code
+        self.severity = severity
+        self.location_code = location_code
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, event: Dict) -> "Event":
+        return cls(event["id"], TYPE_CODES[event["type"]], event["severity"],
+                   LOCATION_CODES[event["location"]], event["timestamp"])
+
+    @property
+    def type(self) -> str:
+        return EVENT_TYPES[self.type_code]
+
+    @property
+    def location(self) -> str:
+        return LOCATIONS[self.location_code]
+
+    def __getitem__(self, key: str):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.KEYS else default
+
+    def __contains__(self, key) -> bool:
+        return key in self.KEYS
+
+    def keys(self):
+        return self.KEYS
+
+    def to_dict(self) -> Dict:
+        return {key: getattr(self, key) for key in self.KEYS}
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Event):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Event({self.to_dict()!r})"
 
 
 class Environment:
-    def __init__(self, seed: Optional[int] = None, base_probability: float = 0.2):
+    def __init__(self, seed: Optional[int] = None, base_probability: float = 0.2,
+                 clock: Optional[Clock] = None, locations: Optional[Sequence[str]] = None,
+                 metrics=None, compact: bool = False):
         """Create a simulated environment.
 
         seed: Optional random seed for reproducible runs
         base_probability: probability each tick that an event is generated (0-1)
+        clock: time source for timestamps and ticks (defaults to wall time)
+        locations: subset of LOCATIONS this environment covers (default all)
+        metrics: optional response_metrics.Metrics registry
+        compact: emit Event objects with integer ids instead of dicts
         """
         self.rand = random.Random(seed)
         self.base_probability = base_probability
+        self.clock = clock or REAL_CLOCK
+        self.locations = list(locations) if locations is not None else LOCATIONS
+        self.seed = seed
+        self._np_rng = None  # created on first bulk call (numpy is imported lazily)
+        self._uuid4 = None  # uuid.uuid4, bound on the first dict event (uuid pulls in platform)
+        self._next_bulk_id = 0
+        self.listeners: List[Callable[[Dict], None]] = []
+        self.metrics = metrics
+        self.compact = compact
+
+    def add_listener(self, callback: Callable[[Dict], None]) -> None:
+        """Call `callback(event)` for every event run() emits, before it is queued.
+
+        Used to tap the stream, e.g. EventJournal.append to record a run.
+        """
+        self.listeners.append(callback)
 
-    def generate_event(self) -> Optional[Dict]:
+    def generate_event(self):
         """Generate one event (or None) according to base_probability.
 
         Event structure:
@@ -35,38 +127,118 @@ class Environment:
             'type': one of EVENT_TYPES,
             'severity': int 1-5 (1 minor, 5 catastrophic),
             'location': str,
-            'timestamp': float (unix time)
+            'timestamp': float (unix time, from self.clock)
           }
+
+        With compact=True the same fields come back as an Event whose id
+        is an int, unique per Environment.
         """
         if self.rand.random() > self.base_probability:
             return None
 
         ev_type = self.rand.choice(EVENT_TYPES)
         severity = self.rand.randint(1, 5)
-        location = self.rand.choice(LOCATIONS)
+        location = self.rand.choice(self.locations)
+        if self.compact:
+            self._next_bulk_id += 1
+            return Event(self._next_bulk_id - 1, TYPE_CODES[ev_type], severity,
+                         LOCATION_CODES[location], self.clock.time())
+        uuid4 = self._uuid4
+        if uuid4 is None:
+            import uuid
+
+            uuid4 = self._uuid4 = uuid.uuid4
         event = {
-            "id": str(uuid.uuid4()),
+            "id": str(uuid4()),
             "type": ev_type,
             "severity": severity,
             "location": location,
-            "timestamp": time.time(),
+            "timestamp": self.clock.time(),
         }
         return event
 
+    def generate_columns(self, n: int, interval: float = 1.0, start: Optional[float] = None) -> Dict:
+        """Generate `n` events at once as NumPy columns.
+
+        Columns (all length n):
+          'id': int64 compact ids, unique per Environment
+          'type': uint8 index into EVENT_TYPES
+          'severity': uint8 1-5
+          'location': uint8 index into LOCATIONS
+          'timestamp': float64, ticks of `interval` seconds from `start`
+
+        The gap between events is drawn from a geometric distribution, which
+        matches the per-tick `base_probability` coin flip of generate_event.
+        Successive calls continue the same seeded stream. Needs
+        0 < base_probability <= 1 (at 0 no event would ever arrive).
+        """
+        if not 0 < self.base_probability <= 1:
+            raise ValueError(f"generate_columns needs 0 < base_probability <= 1, got {self.base_probability}")
+        np = import_numpy("Environment.generate_columns")
+        if self._np_rng is None:
+            self._np_rng = np.random.default_rng(self.seed)
+        rng = self._np_rng
+        if start is None:
+            start = self.clock.time()
+
+        gaps = rng.geometric(self.base_probability, n) if self.base_probability < 1 else np.ones(n, dtype=np.int64)
+        ticks = np.cumsum(gaps) - 1
+        ids = np.arange(self._next_bulk_id, self._next_bulk_id + n, dtype=np.int64)
+        self._next_bulk_id += n
+        return {
+            "id": ids,
+            "type": rng.integers(0, len(EVENT_TYPES), n, dtype=np.uint8),
+            "severity": rng.integers(1, 6, n, dtype=np.uint8),
+            "location": np.array([LOCATION_CODES[loc] for loc in self.locations], dtype=np.uint8)[
+                rng.integers(0, len(self.locations), n)],
+            "timestamp": start + ticks * interval,
+        }
+
+    def generate_events(self, n: int, interval: float = 1.0, start: Optional[float] = None) -> List:
+        """Generate `n` events in bulk as dicts (or Events when compact)."""
+        return list(columns_to_events(self.generate_columns(n, interval, start), compact=self.compact))
+
     async def run(self, queue: asyncio.Queue, interval: float = 1.0, duration: Optional[float] = None):
         """Run a simulation loop: at every `interval` seconds maybe generate an event
         and put it into `queue`.
 
         duration: if provided, stops after `duration` seconds
         """
-        start = time.time()
+        start = self.clock.time()
         while True:
             ev = self.generate_event()
             if ev:
+                for callback in self.listeners:
+                    callback(ev)
                 await queue.put(ev)
-            if duration is not None and (time.time() - start) >= duration:
+                if self.metrics is not None:
+                    self.metrics.inc("events_emitted_total", type=ev["type"])
+                    self.metrics.set_gauge("producer_queue_depth", queue.qsize())
+            if duration is not None and (self.clock.time() - start) >= duration:
                 break
-            await asyncio.sleep(interval)
+            await self.clock.sleep(interval)
+
+
+def columns_to_events(columns: Dict, compact: bool = False) -> Iterator:
+    """Adapt columns from Environment.generate_columns to per-event dicts,
+    or to Event objects (keeping the integer ids) when `compact`."""
+    ids = columns["id"].tolist()
+    types = columns["type"].tolist()
+    severities = columns["severity"].tolist()
+    locations = columns["location"].tolist()
+    timestamps = columns["timestamp"].tolist()
+    if compact:
+        for i in range(len(ids)):
+            yield Event(ids[i], types[i], severities[i], locations[i], timestamps[i])
+        return
+    for i in range(len(ids)):
+        yield {
+            "id": str(ids[i]),
+            "type": EVENT_TYPES[types[i]],
+            "severity": severities[i],
+            "location": LOCATIONS[locations[i]],
+            "timestamp": timestamps[i],
+        }
 
 
 if __name__ == "__main__":
@@ -1,134 +1,468 @@
 import asyncio
 import logging
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Optional
 from response_fsm import FSM, State, build_disaster_response_fsm
 from response_goals import Goal, GoalType, GoalSet, GoalStatus
+from sim_clock import Clock, REAL_CLOCK
+from event_queues import BatchSizeStats, get_batch, make_event_queue
 
+if TYPE_CHECKING:  # annotation only, keeps these modules off the startup path
+    from response_archive import ArchiveWriter
+    from timer_wheel import TimerWheel
 
-def setup_logger(logfile: str = "response_events.log") -> logging.Logger:
-    """Setup logger for response agent."""
+
+def setup_logger(logfile: str = "response_events.log", console: bool = True,
+                 async_mode: bool = False) -> logging.Logger:
+    """Setup logger for response agent.
+
+    console: also echo to the console
+    async_mode: write through a background queue listener in batches so
+        the event loop never blocks on log I/O (see log_pipeline)
+    """
     logger = logging.getLogger("response_agent")
     logger.setLevel(logging.INFO)
     if not logger.handlers:
         handler = logging.FileHandler(logfile)
         fmt = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
         handler.setFormatter(fmt)
-        logger.addHandler(handler)
+        handlers = [handler]
         # Also add console
-        ch = logging.StreamHandler()
-        ch.setFormatter(fmt)
-        logger.addHandler(ch)
+        if console:
+            ch = logging.StreamHandler()
+            ch.setFormatter(fmt)
+            handlers.append(ch)
+        from log_pipeline import attach_handlers
+
+        attach_handlers(logger, handlers, async_mode=async_mode)
     return logger
 
 
+class _Work:
+    """Per-event state carried between the phases of process_event."""
+    __slots__ = ("event", "goal", "response_goal", "incident")
+
+    def __init__(self, event: dict):
+        self.event = event
+        self.goal = None
+        self.response_goal = None
+        self.incident = None
+
+
 class DisasterResponseAgent:
-    def __init__(self, agent_id: str, queue: asyncio.Queue, logger: logging.Logger = None):
+    # Simulated work per phase (seconds on self.clock)
+    ASSESS_DELAY = 0.1
+    RESPOND_DELAY = 0.1
+    RECOVER_DELAY = 0.05
+    DAMAGE_THRESHOLD = 3  # severity at which assessment confirms damage
+
+    def __init__(self, agent_id: str, queue: asyncio.Queue, logger: logging.Logger = None,
+                 clock: Optional[Clock] = None, retention: Optional[int] = None,
+                 archive: Optional["ArchiveWriter"] = None, workers: int = 1,
+                 metrics=None, coalesce_window: Optional[float] = None,
+                 wheel: Optional["TimerWheel"] = None):
+        """retention: cap on finished goals and FSM history kept in memory
+        (None keeps everything); evicted records go to `archive` if given.
+        workers: number of events processed concurrently. With workers > 1
+        each incident gets its own FSM, at most `workers` incidents are in
+        flight, and no further events are taken from the queue until a
+        worker frees up (so a bounded queue pushes back on the producer).
+        metrics: optional response_metrics.Metrics registry
+        coalesce_window: merge repeat events of the same type at the same
+            location within this many seconds into the open incident
+        wheel: run incidents on this timer_wheel.TimerWheel instead of one
+            coroutine each. Every incident gets its own FSM, phase delays
+            are wheel timers and up to `workers` incidents are in flight.
+        """
         self.agent_id = agent_id
         self.queue = queue
         self.logger = logger or setup_logger("response_events")
-        self.fsm = build_disaster_response_fsm()
-        self.goals = GoalSet()
+        self.clock = clock or REAL_CLOCK
+        self.fsm = build_disaster_response_fsm(history_limit=retention, archive=archive).compile()
+        self._incident_fsm = None  # compiled template for per-incident FSMs
+        self.goals = GoalSet(max_terminal=retention, archive=archive)
+        self.workers = workers
+        self.incidents: Dict[str, FSM] = {}  # event id -> FSM, while in flight
+        self.incident_transitions = 0
+        self.incident_state_counts: Counter = Counter()
+        self.events_processed = 0
+        self.events_dequeued = 0
+        self.incidents_failed = 0  # wheel mode: incidents aborted by a phase error
+        self.in_flight: Dict[int, dict] = {}  # id(event) -> event, dequeued but not finished
+        self.batch_stats = BatchSizeStats()
+        self.metrics = metrics
+        self.incident_cache = None
+        if coalesce_window:
+            from incident_cache import IncidentCache
+
+            self.incident_cache = IncidentCache(coalesce_window, self.clock)
+        self.wheel = wheel
+        self._incident_closed: Optional[asyncio.Event] = None  # wheel mode
+        self._events_left = 0  # worker mode: events the workers may still take, together
+        self.state_dwell: Counter = Counter()  # State -> seconds spent there
+        self._entered_at: Dict[int, float] = {}  # id(fsm) -> time current state was entered
+        self._log_batch: Optional[list] = None  # run(batch_size > 1): (msg, args) pending
         self.running = False
 
+    def _log(self, msg: str, *args) -> None:
+        """logger.info, or buffered into the current batch's single record."""
+        if self._log_batch is None:
+            self.logger.info(msg, *args)
+        else:
+            self._log_batch.append((msg, args))
+
+    def _flush_log_batch(self) -> None:
+        batch, self._log_batch = self._log_batch, None
+        if batch:
+            # one record, one line per message; formatting still deferred
+            self.logger.info("\n".join(msg for msg, _ in batch),
+                             *[arg for _, args in batch for arg in args])
+
     def _on_idle_enter(self, context):
-        self.logger.info(f"[{self.agent_id}] Waiting for alerts")
+        self._log("[%s] Waiting for alerts", self.agent_id)
 
     def _on_monitoring_enter(self, context):
-        self.logger.info(f"[{self.agent_id}] Alert detected - checking details")
+        self._log("[%s] Alert detected - checking details", self.agent_id)
 
     def _on_assessing_enter(self, context):
-        self.logger.info(f"[{self.agent_id}] Assessing the situation")
+        self._log("[%s] Assessing the situation", self.agent_id)
 
     def _on_responding_enter(self, context):
-        self.logger.info(f"[{self.agent_id}] Sending response team")
+        self._log("[%s] Sending response team", self.agent_id)
 
     def _on_recovering_enter(self, context):
-        self.logger.info(f"[{self.agent_id}] Recovery in progress")
-
-    def setup_fsm_callbacks(self):
-        """Register FSM state callbacks."""
-        self.fsm.on_enter(State.IDLE, self._on_idle_enter)
-        self.fsm.on_enter(State.MONITORING, self._on_monitoring_enter)
-        self.fsm.on_enter(State.ASSESSING, self._on_assessing_enter)
-        self.fsm.on_enter(State.RESPONDING, self._on_responding_enter)
-        self.fsm.on_enter(State.RECOVERING, self._on_recovering_enter)
-
-    async def process_event(self, event_data: dict) -> None:
-        """React to an environmental event."""
+        self._log("[%s] Recovery in progress", self.agent_id)
+
+    def setup_fsm_callbacks(self, fsm: Optional[FSM] = None):
+        """Register FSM state callbacks (on self.fsm unless `fsm` is given)."""
+        fsm = fsm or self.fsm
+        fsm.on_enter(State.IDLE, self._on_idle_enter)
+        fsm.on_enter(State.MONITORING, self._on_monitoring_enter)
+        fsm.on_enter(State.ASSESSING, self._on_assessing_enter)
+        fsm.on_enter(State.RESPONDING, self._on_responding_enter)
+        fsm.on_enter(State.RECOVERING, self._on_recovering_enter)
+
+    async def process_event(self, event_data: dict, fsm: Optional[FSM] = None) -> None:
+        """React to an environmental event, driving `fsm` (default self.fsm)."""
+        fsm = fsm or self.fsm
+        work = self._begin(event_data, fsm)
+        if work is None:
+            return
+        for state, delay, finish in self._phases:
+            if fsm.is_in_state(state):
+                await self.clock.sleep(delay)
+                finish(fsm, work)
+
+    # process_event split into phases. Each phase runs synchronously; the
+    # simulated work between them is either awaited (process_event) or
+    # scheduled on a TimerWheel (wheel mode, see _advance).
+
+    @property
+    def _phases(self):
+        return ((State.ASSESSING, self.ASSESS_DELAY, self._assessed),
+                (State.RESPONDING, self.RESPOND_DELAY, self._responded),
+                (State.RECOVERING, self.RECOVER_DELAY, self._recovered))
+
+    def _begin(self, event_data: dict, fsm: FSM) -> Optional["_Work"]:
+        """Log, coalesce and plan the assessment; None if merged away."""
+        self.events_processed += 1
         ev_type = event_data["type"]
         severity = event_data["severity"]
         location = event_data["location"]
-        ev_id = event_data["id"]
+        work = _Work(event_data)
+
+        self._log("[%s] Alert: %s at %s (level %s)", self.agent_id, ev_type, location, severity)
 
-        self.logger.info(f"[{self.agent_id}] Alert: {ev_type} at {location} (level {severity})")
+        if self.incident_cache is not None:
+            incident = self.incident_cache.lookup(event_data)
+            # a repeat is only new work if it escalates an incident judged safe
+            escalates = incident is not None and incident.threat is False and severity >= self.DAMAGE_THRESHOLD
+            if incident is not None and not escalates:
+                self.incident_cache.merge(incident, event_data)
+                self._log("[%s] Merged into open incident at %s (level %s, %d merged)",
+                          self.agent_id, location, incident.severity, incident.merged)
+                if self.metrics is not None:
+                    self.metrics.inc("events_coalesced_total", type=ev_type)
+                return None
+            work.incident = incident
 
-        
-        if self.fsm.is_in_state(State.IDLE):
-            self.fsm.handle_event("event_detected", {"event": event_data})
+        if fsm.is_in_state(State.IDLE):
+            self._transition(fsm, "event_detected", {"event": event_data})
 
         # Create assessment goal
-        if self.fsm.is_in_state(State.MONITORING):
+        if fsm.is_in_state(State.MONITORING):
             goal = Goal(
                 goal_type=GoalType.ASSESS_DAMAGE,
                 location=location,
                 priority=severity,
-                event_id=ev_id
+                event_id=event_data["id"],
+                status=GoalStatus.ACTIVE,
+                created_at=self.clock.time()
             )
             self.goals.add_goal(goal)
-            self.logger.info(f"[{self.agent_id}] Plan: Assess damage at {goal.location}")
-            self.fsm.handle_event("assess_damage", {"goal": goal})
-
-        # Simulate assessment; if severity >= 3, confirm damage
-        if self.fsm.is_in_state(State.ASSESSING):
-            await asyncio.sleep(0.1)  # quick simulation of assessment
-            if severity >= 3:
-                self.fsm.handle_event("damage_confirmed", {})
-                # Create response goal
-                response_goal = Goal(
-                    goal_type=GoalType.RESCUE,
-                    location=location,
-                    priority=severity,
-                    event_id=ev_id
-                )
-                self.goals.add_goal(response_goal)
-                self.logger.info(f"[{self.agent_id}] Damage confirmed - sending rescue to {location}")
-            else:
-                self.fsm.handle_event("no_threat", {})
-                self.logger.info(f"[{self.agent_id}] Situation safe - no major action needed")
+            work.goal = goal
+            if self.incident_cache is not None:
+                work.incident = self.incident_cache.register(event_data, goal)
+            self._log("[%s] Plan: Assess damage at %s", self.agent_id, goal.location)
+            self._transition(fsm, "assess_damage", {"goal": goal})
+        return work
+
+    def _assessed(self, fsm: FSM, work: "_Work") -> None:
+        """End of assessment: if severity >= 3, confirm damage."""
+        event_data = work.event
+        location = event_data["location"]
+        severity = event_data["severity"]
+        incident = work.incident
+        self._complete_goal(work.goal)
+        # merged duplicates may have raised the incident's severity
+        if incident is not None:
+            severity = incident.severity
+            incident.threat = severity >= self.DAMAGE_THRESHOLD
+        if severity >= self.DAMAGE_THRESHOLD:
+            self._transition(fsm, "damage_confirmed", {})
+            # Create response goal
+            response_goal = Goal(
+                goal_type=GoalType.RESCUE,
+                location=location,
+                priority=severity,
+                event_id=event_data["id"],
+                status=GoalStatus.ACTIVE,
+                created_at=self.clock.time()
+            )
+            self.goals.add_goal(response_goal)
+            work.response_goal = response_goal
+            if incident is not None:
+                incident.goals.append(response_goal)
+            self._log("[%s] Damage confirmed - sending rescue to %s", self.agent_id, location)
+        else:
+            self._transition(fsm, "no_threat", {})
+            self._log("[%s] Situation safe - no major action needed", self.agent_id)
 
-        # Execute response
-        if self.fsm.is_in_state(State.RESPONDING):
-            await asyncio.sleep(0.1)  # simulate response time
-            self.fsm.handle_event("goal_complete", {})
+    def _responded(self, fsm: FSM, work: "_Work") -> None:
+        self._complete_goal(work.response_goal)
+        self._transition(fsm, "goal_complete", {})
 
-        # Recover
-        if self.fsm.is_in_state(State.RECOVERING):
-            await asyncio.sleep(0.05)
-            self.fsm.handle_event("recovery_done", {})
+    def _recovered(self, fsm: FSM, work: "_Work") -> None:
+        self._transition(fsm, "recovery_done", {})
 
-    async def run(self, cycles: int = 20, timeout: float = 0.5) -> None:
-        """Run the agent for a number of cycles."""
-        self.setup_fsm_callbacks()
-        self.running = True
-        self.logger.info(f"[{self.agent_id}] System online - monitoring...")
+    def _transition(self, fsm: FSM, event: str, context: dict) -> bool:
+        """fsm.handle_event plus per-state dwell-time accounting."""
+        prev = fsm.current_state
+        if not fsm.handle_event(event, context):
+            return False
+        now = self.clock.time()
+        dwell = now - self._entered_at.get(id(fsm), now)
+        self._entered_at[id(fsm)] = now
+        self.state_dwell[prev] += dwell
+        if self.metrics is not None:
+            self.metrics.observe("state_dwell_seconds", dwell, state=prev.value)
+        return True
 
+    def _complete_goal(self, goal: Optional[Goal]) -> None:
+        if goal is None:
+            return
+        self.goals.mark_completed(goal)
+        if self.metrics is not None and goal.created_at is not None:
+            self.metrics.observe("goal_completion_seconds", self.clock.time() - goal.created_at,
+                                 type=goal.goal_type.value)
+
+    def _dequeued(self, event_data: dict) -> None:
+        self.events_dequeued += 1
+        self.in_flight[id(event_data)] = event_data
+        if self.metrics is not None:
+            self.metrics.observe("queue_wait_seconds", self.clock.time() - event_data["timestamp"],
+                                 agent=self.agent_id)
+            self.metrics.set_gauge("consumer_queue_depth", self.queue.qsize(), agent=self.agent_id)
+
+    def _finished(self, event_data: dict) -> None:
+        self.in_flight.pop(id(event_data), None)
+
+    def _timed_out(self) -> None:
+        if self.metrics is not None:
+            self.metrics.inc("agent_timeouts_total", agent=self.agent_id)
+
+    def stats(self) -> dict:
+        """Plain-data summary of goal and FSM counters (picklable, JSON-safe)."""
+        state_counts = self.fsm.state_counts + self.incident_state_counts
+        return {
+            "agent_id": self.agent_id,
+            "events_processed": self.events_processed,
+            "events_coalesced": self.incident_cache.merged if self.incident_cache else 0,
+            "incidents_failed": self.incidents_failed,
+            "goals_total": self.goals.total_added,
+            "goals_by_type": {t.value: n for t, n in self.goals.type_counts.items()},
+            "goals_by_status": {s.value: n for s, n in self.goals.status_counts.items() if n},
+            "transitions": self.fsm.transition_count + self.incident_transitions,
+            "state_visits": {s.value: n for s, n in state_counts.items()},
+        }
+
+    async def process_incident(self, event_data: dict) -> None:
+        """Process one event on its own FSM so incidents don't serialize."""
+        fsm = self._open_incident(event_data)
+        try:
+            await self.process_event(event_data, fsm)
+        finally:
+            self._close_incident(event_data, fsm)
+
+    def _open_incident(self, event_data: dict) -> FSM:
+        if self._incident_fsm is None:
+            self._incident_fsm = build_disaster_response_fsm().compile()
+            self.setup_fsm_callbacks(self._incident_fsm)
+        fsm = self._incident_fsm.spawn()
+        self.incidents[event_data["id"]] = fsm
+        self._entered_at[id(fsm)] = self.clock.time()
+        return fsm
+
+    def _close_incident(self, event_data: dict, fsm: FSM) -> None:
+        del self.incidents[event_data["id"]]
+        del self._entered_at[id(fsm)]
+        self.incident_transitions += fsm.transition_count
+        # starting in the spawn state is not a visit (self.fsm already
+        # counts one), so state_visits match sequential mode
+        visits = fsm.state_counts.copy()
+        visits[fsm.initial_state] -= 1
+        self.incident_state_counts.update(visits)
+        self._finished(event_data)
+        if self._incident_closed is not None:
+            self._incident_closed.set()
+
+    def _advance(self, fsm: FSM, work: _Work) -> None:
+        """Wheel mode: schedule the next phase of an incident, or close it."""
+        for state, delay, finish in self._phases:
+            if fsm.is_in_state(state):
+                self.wheel.schedule(delay, self._finish_phase, finish, fsm, work)
+                return
+        self._close_incident(work.event, fsm)
+
+    def _finish_phase(self, finish, fsm: FSM, work: _Work) -> None:
+        try:
+            finish(fsm, work)
+        except Exception:
+            # the wheel would only report the error, leaving the incident
+            # open and _run_wheel waiting on it forever
+            self._abort_incident(fsm, work)
+            return
+        self._advance(fsm, work)
+
+    def _abort_incident(self, fsm: FSM, work: _Work) -> None:
+        """Wheel mode: fail the open goals of an incident whose phase raised, and close it."""
+        event_data = work.event
+        self.logger.exception("[%s] Incident at %s aborted in %s", self.agent_id,
+                              event_data["location"], fsm.current_state.value)
+        for goal in (work.goal, work.response_goal):
+            if goal is not None and goal.status == GoalStatus.ACTIVE:
+                self.goals.mark_failed(goal)
+        self.incidents_failed += 1
+        if self.metrics is not None:
+            self.metrics.inc("incidents_failed_total", agent=self.agent_id)
+        self._close_incident(event_data, fsm)
+
+    async def _run_wheel(self, cycles: int, timeout: float) -> None:
+        self._incident_closed = asyncio.Event()
         for _ in range(cycles):
+            while len(self.incidents) >= self.workers:
+                self._incident_closed.clear()
+                await self._incident_closed.wait()
             try:
                 event_data = await asyncio.wait_for(self.queue.get(), timeout)
-                await self.process_event(event_data)
             except asyncio.TimeoutError:
-                pass
+                self._timed_out()
+                continue
+            self._dequeued(event_data)
+            fsm = self._open_incident(event_data)
+            work = self._begin(event_data, fsm)
+            if work is None:  # coalesced into an open incident
+                self._close_incident(event_data, fsm)
+            else:
+                self._advance(fsm, work)
+        while self.incidents:
+            self._incident_closed.clear()
+            await self._incident_closed.wait()
+
+    async def _worker(self, cycles: int, timeout: float) -> None:
+        # `cycles` means the same as in sequential mode: each worker polls
+        # at most `cycles` times (idle workers time out in parallel, so an
+        # idle pool runs as long as one agent), and all workers together
+        # take at most `cycles` events
+        for _ in range(cycles):
+            if self._events_left <= 0:
+                return
+            self._events_left -= 1  # reserved while waiting, so no poll overshoots
+            try:
+                event_data = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                self._events_left += 1
+                self._timed_out()
+                continue
+            self._dequeued(event_data)
+            await self.process_incident(event_data)
+
+    async def run(self, cycles: int = 20, timeout: float = 0.5, batch_size: int = 1) -> None:
+        """Run the agent for a number of cycles.
+
+        batch_size > 1: each cycle drains up to that many ready events,
+        processes them in order and logs the batch as one record with one
+        line per message. Sequential mode only (ValueError with workers or
+        a wheel, which take one event at a time so the in-flight cap stays
+        exact). Achieved sizes are reported by self.batch_stats.
+        """
+        if batch_size > 1 and (self.workers > 1 or self.wheel is not None):
+            raise ValueError("batch_size > 1 needs sequential mode (workers=1, no wheel)")
+        self.setup_fsm_callbacks()
+        self._entered_at.setdefault(id(self.fsm), self.clock.time())
+        self.running = True
+        self.logger.info("[%s] System online - monitoring...", self.agent_id)
+
+        if self.wheel is not None:
+            await self._run_wheel(cycles, timeout)
+        elif self.workers > 1:
+            self._events_left = cycles
+            await asyncio.gather(*(self._worker(cycles, timeout) for _ in range(self.workers)))
+        elif batch_size > 1:
+            for _ in range(cycles):
+                batch = await get_batch(self.queue, batch_size, timeout)
+                if batch:
+                    self.batch_stats.record(len(batch))
+                else:
+                    self._timed_out()
+                self._log_batch = []
+                try:
+                    for event_data in batch:
+                        self._dequeued(event_data)
+                        await self.process_event(event_data)
+                        self._finished(event_data)
+                finally:
+                    self._flush_log_batch()
+        else:
+            for _ in range(cycles):
+                try:
+                    event_data = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    self._timed_out()
+                    continue
+                self._dequeued(event_data)
+                await self.process_event(event_data)
+                self._finished(event_data)
 
         self.running = False
-        self.logger.info(f"[{self.agent_id}] Monitoring complete")
+        self.logger.info("[%s] Monitoring complete", self.agent_id)
+
 
+async def demo_run(duration: float = 3.0, clock: Optional[Clock] = None, workers: int = 1,
+                   queue_mode: str = "fifo", queue_size: int = 0, overflow: str = "block"):
+    """Demo: Environment -> Sensor -> DisasterResponseAgent with FSM.
 
-async def demo_run(duration: float = 3.0):
-    """Demo: Environment -> Sensor -> DisasterResponseAgent with FSM."""
+    Pass a VirtualClock (and run via clock.run) to fast-forward the demo.
+    workers > 1 processes incidents concurrently.
+    queue_mode "priority" serves severe events first (see event_queues).
+    queue_size > 0 bounds the queue; `overflow` picks the shedding policy.
+    """
     from disaster_environment import Environment
 
-    q = asyncio.Queue()
-    env = Environment(seed=42, base_probability=0.5)
-    agent = DisasterResponseAgent("ResponseAgent-1", q)
+    bounds = {"maxsize": queue_size, "overflow": overflow} if queue_size else {}
+    q = make_event_queue(queue_mode, clock=clock, **bounds)
+    env = Environment(seed=42, base_probability=0.5, clock=clock)
+    agent = DisasterResponseAgent("ResponseAgent-1", q, clock=clock, workers=workers)
 
     env_task = asyncio.create_task(env.run(q, interval=0.3, duration=duration))
     agent_task = asyncio.create_task(agent.run(cycles=int(duration / 0.3) + 3, timeout=0.35))
@@ -0,0 +1,224 @@
+"""Compact binary event journal and replay
+
+Events are stored as fixed-width 32-byte records after an 8-byte header:
+
+  id        16 bytes  UUID bytes, or the integer id (big-endian)
+  timestamp float64
+  type      uint8     index into EVENT_TYPES
+  severity  uint8
+  location  uint8     index into LOCATIONS
+  id kind   uint8     how to turn the id bytes back into the original id
+  (4 bytes padding)
+
+The file is append-only; reopening it for writing first cuts off a torn
+final record left by a crash. Readers memory-map it, so record i can be read
+at offset HEADER_SIZE + i * RECORD_SIZE without parsing anything else.
+ReplayEnvironment feeds a recorded journal (or any event iterable) into
+an asyncio.Queue just like Environment.run.
+"""
+
+import asyncio
+import mmap
+import os
+import struct
+import uuid
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+from disaster_environment import EVENT_TYPES, LOCATIONS, LOCATION_CODES, TYPE_CODES
+from sim_clock import Clock, REAL_CLOCK
+
+MAGIC = b"EVJ1"
+HEADER = struct.Struct("<4sI")  # magic, record size
+RECORD = struct.Struct("<16sdBBBB4x")
+HEADER_SIZE = HEADER.size
+RECORD_SIZE = RECORD.size
+
+# id kinds
+ID_UUID = 0  # canonical UUID string
+ID_INT = 1  # int
+ID_DECIMAL = 2  # decimal string, e.g. from columns_to_events
+
+
+def encode_event(event) -> bytes:
+    """Pack one event into a fixed-width record."""
+    ev_id = event["id"]
+    if isinstance(ev_id, int):
+        kind, raw = ID_INT, ev_id.to_bytes(16, "big")
+    elif ev_id.isdigit():
+        kind, raw = ID_DECIMAL, int(ev_id).to_bytes(16, "big")
+    else:
+        kind, raw = ID_UUID, uuid.UUID(ev_id).bytes
+    return RECORD.pack(raw, event["timestamp"], TYPE_CODES[event["type"]],
+                       event["severity"], LOCATION_CODES[event["location"]], kind)
+
+
+def decode_event(record) -> Dict:
+    """Unpack a record back into the Environment event dict schema."""
+    return _event_from_fields(RECORD.unpack(record))
+
+
+def _event_from_fields(fields) -> Dict:
+    raw, timestamp, type_code, severity, location_code, kind = fields
+    if kind == ID_UUID:
+        ev_id = str(uuid.UUID(bytes=raw))
+    elif kind == ID_INT:
+        ev_id = int.from_bytes(raw, "big")
+    else:
+        ev_id = str(int.from_bytes(raw, "big"))
+    return {
+        "id": ev_id,
+        "type": EVENT_TYPES[type_code],
+        "severity": severity,
+        "location": LOCATIONS[location_code],
+        "timestamp": timestamp,
+    }
+
+
+class EventJournal:
+    """Append-only writer for a binary event journal."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "ab")
+        size = self._fh.tell()
+        if size == 0:
+            self._fh.write(HEADER.pack(MAGIC, RECORD_SIZE))
+            self.count = 0
+            return
+        with open(path, "rb") as fh:
+            header = fh.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or HEADER.unpack(header) != (MAGIC, RECORD_SIZE):
+            self._fh.close()
+            raise ValueError(f"{path}: not an event journal")
+        self.count = (size - HEADER_SIZE) // RECORD_SIZE
+        end = HEADER_SIZE + self.count * RECORD_SIZE
+        if end != size:
+            # drop a torn final record (crash mid-append) so new records
+            # start on a record boundary
+            self._fh.truncate(end)
+
+    def append(self, event) -> None:
+        """Record one event (usable as an Environment listener)."""
+        self._fh.write(encode_event(event))
+        self.count += 1
+
+    def flush(self) -> None:
+        self._fh.flush()
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JournalReader:
+    """Memory-mapped random access over a journal file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = open(path, "rb")
+        size = os.fstat(self._fh.fileno()).st_size
+        if size < HEADER_SIZE:
+            raise ValueError(f"{path}: not an event journal")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or record_size != RECORD_SIZE:
+            raise ValueError(f"{path}: not an event journal")
+        # a torn final record (crash mid-append) is ignored
+        self._count = (size - HEADER_SIZE) // RECORD_SIZE
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        offset = HEADER_SIZE + index * RECORD_SIZE
+        return decode_event(self._mm[offset:offset + RECORD_SIZE])
+
+    def iter_from(self, start: int = 0) -> Iterator[Dict]:
+        """Yield events from record `start` to the end."""
+        view = memoryview(self._mm)[HEADER_SIZE + start * RECORD_SIZE:HEADER_SIZE + self._count * RECORD_SIZE]
+        try:
+            for fields in RECORD.iter_unpack(view):
+                yield _event_from_fields(fields)
+        finally:
+            view.release()
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self.iter_from(0)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_journal(path: str) -> Iterator[Dict]:
+    """Stream all events recorded in `path`."""
+    with JournalReader(path) as reader:
+        yield from reader
+
+
+class ReplayEnvironment:
+    """Feed recorded events into a queue with the Environment.run interface.
+
+    source: journal path or an iterable of events ordered by timestamp
+    speed: 1.0 replays at recorded pace, 2.0 twice as fast, None as fast
+        as possible
+    retime: stamp events with the clock's time on release instead of
+        keeping the recorded timestamps
+    """
+
+    def __init__(self, source: Union[str, Iterable[Dict]], speed: Optional[float] = 1.0,
+                 clock: Optional[Clock] = None, retime: bool = False):
+        self.source = source
+        self.speed = speed
+        self.clock = clock or REAL_CLOCK
+        self.retime = retime
+        self.listeners = []
+
+    def add_listener(self, callback) -> None:
+        """Same as Environment.add_listener."""
+        self.listeners.append(callback)
+
+    def _events(self) -> Iterator[Dict]:
+        if isinstance(self.source, (str, os.PathLike)):
+            return read_journal(self.source)
+        return iter(self.source)
+
+    async def run(self, queue: asyncio.Queue, interval: Optional[float] = None,
+                  duration: Optional[float] = None):
+        """Replay events into `queue`; `interval` is accepted for signature
+        compatibility and ignored. Stops after `duration` replayed seconds."""
+        first_ts = None
+        start = self.clock.time()
+        for ev in self._events():
+            if first_ts is None:
+                first_ts = ev["timestamp"]
+            offset = ev["timestamp"] - first_ts
+            if duration is not None and offset > duration:
+                break
+            if self.speed is None:
+                await asyncio.sleep(0)  # let consumers run between events
+            else:
+                delay = start + offset / self.speed - self.clock.time()
+                if delay > 0:
+                    await self.clock.sleep(delay)
+            if self.retime:
+                ev = dict(ev, timestamp=self.clock.time())
+            for callback in self.listeners:
+                callback(ev)
+            await queue.put(ev)
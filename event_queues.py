@@ -0,0 +1,207 @@
+"""Queue helpers shared by the environment and the agents
+
+EventQueue is a drop-in asyncio.Queue for events. It keeps one FIFO
+bucket per severity level (1-5), so it can serve events either in
+arrival order or most-severe-first. Priority mode uses anti-starvation
+aging: an event's effective priority grows by one level per `aging`
+seconds waited, so minor events still drain under sustained overload.
+
+With a maxsize the queue is bounded and `overflow` decides what happens
+when a producer puts into a full queue:
+
+  block         put() waits for room (plain asyncio.Queue backpressure)
+  drop_lowest   evict the oldest event of the lowest queued severity, or
+                drop the incoming one if it is no more severe than that
+  drop_oldest   evict the event that has waited longest
+  sample        admit one incoming event in `sample_every` (evicting the
+                oldest), drop the rest
+
+Non-blocking policies never suspend the producer; every shed event is
+counted in shed_counts and, with a metrics registry, in
+events_dropped_total{reason}.
+
+get_batch drains several ready events per wakeup. It only pays for one
+asyncio.wait_for (timer handle + task) when the queue is actually empty,
+then takes whatever else is ready with get_nowait.
+"""
+
+import asyncio
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+from sim_clock import Clock, REAL_CLOCK
+
+SEVERITY_LEVELS = 5
+QUEUE_MODES = ("fifo", "priority")
+OVERFLOW_POLICIES = ("block", "drop_lowest", "drop_oldest", "sample")
+
+
+class EventQueue(asyncio.Queue):
+    """asyncio.Queue of event dicts bucketed by severity.
+
+    order: "fifo" serves in arrival order, "priority" serves the highest
+        effective priority first (severity, then oldest)
+    aging: seconds of waiting worth one severity level in priority mode
+        (None disables aging)
+    overflow: what a put into a full queue does (see OVERFLOW_POLICIES)
+    sample_every: admission rate of the "sample" policy
+    metrics: optional response_metrics.Metrics for events_dropped_total
+    """
+
+    def __init__(self, maxsize: int = 0, order: str = "priority", aging: Optional[float] = 5.0,
+                 clock: Optional[Clock] = None, overflow: str = "block", sample_every: int = 10,
+                 metrics=None):
+        if order not in QUEUE_MODES:
+            raise ValueError(f"order must be one of {QUEUE_MODES}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self.order = order
+        self.aging = aging
+        self.clock = clock or REAL_CLOCK
+        self.overflow = overflow
+        self.sample_every = max(1, sample_every)
+        self.metrics = metrics
+        self.shed_counts: Counter = Counter()
+        self._overflow_seen = 0
+        super().__init__(maxsize)
+
+    # storage hooks used by asyncio.Queue
+
+    def _init(self, maxsize: int) -> None:
+        # bucket i holds (seq, enqueued_at, event) for severity i + 1
+        self._buckets = [deque() for _ in range(SEVERITY_LEVELS)]
+        self._seq = 0
+        self._size = 0
+
+    # asyncio.Queue.qsize()/empty() read self._queue, which we don't use
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def _put(self, item) -> None:
+        level = min(SEVERITY_LEVELS, max(1, int(item["severity"]))) - 1
+        self._buckets[level].append((self._seq, self.clock.time(), item))
+        self._seq += 1
+        self._size += 1
+
+    def _get(self):
+        bucket = self._buckets[self._next_bucket()]
+        self._size -= 1
+        return bucket.popleft()[2]
+
+    def _next_bucket(self) -> int:
+        heads = [(i, b[0]) for i, b in enumerate(self._buckets) if b]
+        if self.order == "fifo":
+            return min(heads, key=lambda h: h[1][0])[0]
+        if self.aging is None:
+            return heads[-1][0]
+        now = self.clock.time()
+        # effective priority = severity + waited / aging; ties go to the oldest
+        return max(heads, key=lambda h: (h[0] + (now - h[1][1]) / self.aging, -h[1][0]))[0]
+
+    # overflow handling
+
+    async def put(self, item) -> None:
+        if self.overflow == "block":
+            return await super().put(item)
+        self.put_nowait(item)
+
+    def put_nowait(self, item) -> None:
+        if self.full() and self.overflow != "block":
+            if not self._make_room(item):
+                return
+        super().put_nowait(item)
+
+    def _make_room(self, item) -> bool:
+        """Shed one event for `item`; False if `item` itself is dropped."""
+        if self.overflow == "drop_oldest":
+            self._evict(min((b for b in self._buckets if b), key=lambda b: b[0][0]), "oldest")
+            return True
+        if self.overflow == "drop_lowest":
+            level = next(i for i, b in enumerate(self._buckets) if b)
+            if int(item["severity"]) - 1 <= level:
+                self._shed("lowest_severity")
+                return False
+            self._evict(self._buckets[level], "lowest_severity")
+            return True
+        # sample
+        self._overflow_seen += 1
+        if self._overflow_seen % self.sample_every:
+            self._shed("sampled")
+            return False
+        self._evict(min((b for b in self._buckets if b), key=lambda b: b[0][0]), "sampled")
+        return True
+
+    def _evict(self, bucket: deque, reason: str) -> None:
+        bucket.popleft()
+        self._size -= 1
+        # the evicted event will never be task_done()'d by a consumer
+        self._unfinished_tasks -= 1
+        self._shed(reason)
+
+    def _shed(self, reason: str) -> None:
+        self.shed_counts[reason] += 1
+        if self.metrics is not None:
+            self.metrics.inc("events_dropped_total", reason=reason)
+
+    @property
+    def dropped(self) -> int:
+        return sum(self.shed_counts.values())
+
+    def depth_by_severity(self) -> Dict[int, int]:
+        """Queued events per severity level."""
+        return {i + 1: len(b) for i, b in enumerate(self._buckets)}
+
+
+def make_event_queue(mode: str = "fifo", clock: Optional[Clock] = None, **kwargs) -> asyncio.Queue:
+    """Queue for the Environment -> agent hop.
+
+    mode "fifo" gives a plain asyncio.Queue (the historical behaviour);
+    "priority" gives a severity-ordered EventQueue with aging. Passing
+    maxsize/overflow gives a bounded EventQueue in either order.
+    """
+    if mode == "fifo" and not kwargs:
+        return asyncio.Queue()
+    return EventQueue(order=mode, clock=clock, **kwargs)
+
+
+async def get_batch(queue: asyncio.Queue, max_items: int, timeout: float) -> List:
+    """Return 1..max_items queued items, or [] if none arrives within `timeout`."""
+    if queue.empty():
+        try:
+            first = await asyncio.wait_for(queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+    else:
+        first = queue.get_nowait()
+    batch = [first]
+    while len(batch) < max_items:
+        try:
+            batch.append(queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    return batch
+
+
+class BatchSizeStats:
+    """Histogram of achieved batch sizes."""
+
+    def __init__(self):
+        self.sizes: Counter = Counter()
+
+    def record(self, size: int) -> None:
+        self.sizes[size] += 1
+
+    def summary(self) -> Dict:
+        batches = sum(self.sizes.values())
+        items = sum(size * n for size, n in self.sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean": items / batches if batches else 0.0,
+            "max": max(self.sizes, default=0),
+            "histogram": dict(sorted(self.sizes.items())),
+        }
@@ -0,0 +1,154 @@
+"""Monte Carlo experiment runner
+
+Sweeps a grid of seeds, base_probability, interval and agent counts.
+Each trial is one Environment feeding `agents` location-sharded
+DisasterResponseAgents. It runs headless on its own VirtualClock, so a
+trial costs CPU time only. Trials are spread over a process pool, and one
+CSV row per trial is streamed to the results file as trials finish:
+
+  python experiments.py --seeds 20 --base-probability 0.2 0.5 \\
+      --interval 0.3 1.0 --agents 1 2 4 --workers 4 --output results.csv
+
+A trial depends only on its parameters (seeded RNG, virtual time,
+integer event ids), and executor.map yields results in submission order,
+so the file is byte-for-byte identical whatever --workers is.
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+from response_fsm import State
+
+PARAMS = ("seed", "base_probability", "interval", "agents", "duration")
+METRICS = ("events", "goals_total", "rescues", "goals_completed", "goals_failed", "transitions",
+           "sim_seconds")
+DWELL = tuple(f"dwell_{state.value}" for state in State)
+COLUMNS = PARAMS + METRICS + DWELL
+
+
+def grid(seeds: Iterable[int], base_probabilities: Sequence[float] = (0.5,),
+         intervals: Sequence[float] = (0.3,), agent_counts: Sequence[int] = (1,),
+         duration: float = 3600.0) -> List[Dict]:
+    """Every combination of the parameters, in a fixed order."""
+    return [
+        {"seed": seed, "base_probability": p, "interval": interval, "agents": agents,
+         "duration": duration}
+        for seed, p, interval, agents in itertools.product(seeds, base_probabilities,
+                                                           intervals, agent_counts)
+    ]
+
+
+def _headless_logger() -> logging.Logger:
+    logger = logging.getLogger("response_agent.experiment")
+    logger.propagate = False
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+def run_trial(params: Dict) -> Dict:
+    """Run one trial in simulated time and return a results row."""
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from event_dispatcher import LocationDispatcher
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+    env = Environment(seed=params["seed"], base_probability=params["base_probability"],
+                      clock=clock, compact=True)
+    dispatcher = LocationDispatcher(params["agents"])
+    logger = _headless_logger()
+    agents = [DisasterResponseAgent(f"Trial-{i + 1}", q, logger=logger, clock=clock, retention=0)
+              for i, q in enumerate(dispatcher.queues)]
+    interval, duration = params["interval"], params["duration"]
+
+    async def trial():
+        await asyncio.gather(
+            env.run(dispatcher, interval=interval, duration=duration),
+            *(agent.run(cycles=int(duration / interval) + 3, timeout=interval + 0.05)
+              for agent in agents),
+        )
+
+    clock.run(trial())
+
+    row = dict(params)
+    row.update({name: 0 for name in METRICS + DWELL})
+    for agent in agents:
+        stats = agent.stats()
+        row["events"] += stats["events_processed"]
+        row["goals_total"] += stats["goals_total"]
+        row["rescues"] += stats["goals_by_type"].get("rescue", 0)
+        row["goals_completed"] += stats["goals_by_status"].get("completed", 0)
+        row["goals_failed"] += stats["goals_by_status"].get("failed", 0)
+        row["transitions"] += stats["transitions"]
+        for state, seconds in agent.state_dwell.items():
+            row[f"dwell_{state.value}"] += seconds
+    row["sim_seconds"] = clock.elapsed
+    return row
+
+
+def run_experiments(trials: Sequence[Dict], workers: Optional[int] = None,
+                    output: Optional[str] = None) -> Iterator[Dict]:
+    """Run `trials` and yield their rows in trial order.
+
+    workers: process count (None = all cores, 1 = in this process)
+    output: CSV path; each row is written and flushed as it arrives
+    """
+    workers = workers or os.cpu_count() or 1
+    fh = open(output, "w", newline="", encoding="utf-8") if output else None
+    try:
+        writer = None
+        if fh is not None:
+            writer = csv.DictWriter(fh, fieldnames=COLUMNS)
+            writer.writeheader()
+        if workers == 1:
+            for row in map(run_trial, trials):
+                yield _emit(row, writer, fh)
+        else:
+            chunksize = max(1, len(trials) // (workers * 4))
+            with ProcessPoolExecutor(workers) as pool:
+                for row in pool.map(run_trial, trials, chunksize=chunksize):
+                    yield _emit(row, writer, fh)
+    finally:
+        if fh is not None:
+            fh.close()
+
+
+def _emit(row: Dict, writer: Optional[csv.DictWriter], fh) -> Dict:
+    if writer is not None:
+        writer.writerow({k: (round(v, 6) if isinstance(v, float) else v) for k, v in row.items()})
+        fh.flush()
+    return row
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep simulation parameters across processes")
+    parser.add_argument("--seeds", type=int, default=10, help="number of seeds (0..N-1)")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--base-probability", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--interval", type=float, nargs="+", default=[0.3])
+    parser.add_argument("--agents", type=int, nargs="+", default=[1])
+    parser.add_argument("--duration", type=float, default=3600.0, help="simulated seconds per trial")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default="experiments.csv")
+    args = parser.parse_args(argv)
+
+    trials = grid(range(args.first_seed, args.first_seed + args.seeds), args.base_probability,
+                  args.interval, args.agents, args.duration)
+    done = 0
+    for _ in run_experiments(trials, workers=args.workers, output=args.output):
+        done += 1
+        print(f"\r{done}/{len(trials)} trials", end="", file=sys.stderr, flush=True)
+    print(f"\nwrote {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Time-windowed coalescing of duplicate incidents
+
+Environment can report the same kind of event at the same location
+several times within seconds. IncidentCache remembers each open incident
+by (type, location) for `ttl` seconds after it was first reported, so
+DisasterResponseAgent can fold repeats into the existing incident
+(raising its priority) instead of assessing the same damage again.
+"""
+
+from collections import Counter, OrderedDict
+from typing import List, Optional, Tuple
+
+from response_goals import Goal
+from sim_clock import Clock, REAL_CLOCK
+
+
+class Incident:
+    """One open incident and the goals created for it."""
+
+    __slots__ = ("key", "event_id", "severity", "first_seen", "last_seen", "merged", "threat", "goals")
+
+    def __init__(self, key: Tuple[str, str], event_id, severity: int, now: float):
+        self.key = key
+        self.event_id = event_id
+        self.severity = severity
+        self.first_seen = now
+        self.last_seen = now
+        self.merged = 0  # duplicate events folded into this incident
+        self.threat: Optional[bool] = None  # set once assessment finishes
+        self.goals: List[Goal] = []
+
+
+class IncidentCache:
+    """Open incidents keyed by (type, location), evicted `ttl` seconds
+    after first being reported."""
+
+    def __init__(self, ttl: float, clock: Optional[Clock] = None):
+        self.ttl = ttl
+        self.clock = clock or REAL_CLOCK
+        self._incidents: "OrderedDict[Tuple[str, str], Incident]" = OrderedDict()
+        self.merged = 0
+        self.merged_by_key: Counter = Counter()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    def _expire(self, now: float) -> None:
+        # insertion order == first_seen order, so expired entries are at the front
+        incidents = self._incidents
+        while incidents:
+            incident = next(iter(incidents.values()))
+            if incident.first_seen + self.ttl > now:
+                break
+            incidents.popitem(last=False)
+            self.evicted += 1
+
+    def lookup(self, event) -> Optional[Incident]:
+        """Return the open incident matching `event`, if any."""
+        self._expire(self.clock.time())
+        return self._incidents.get((event["type"], event["location"]))
+
+    def register(self, event, goal: Optional[Goal] = None) -> Incident:
+        """Open a new incident for `event`, replacing any existing one."""
+        key = (event["type"], event["location"])
+        incident = Incident(key, event["id"], event["severity"], self.clock.time())
+        if goal is not None:
+            incident.goals.append(goal)
+        self._incidents.pop(key, None)
+        self._incidents[key] = incident
+        return incident
+
+    def merge(self, incident: Incident, event) -> None:
+        """Fold duplicate `event` into `incident`, raising goal priorities
+        if it is more severe."""
+        incident.merged += 1
+        incident.last_seen = self.clock.time()
+        self.merged += 1
+        self.merged_by_key[incident.key] += 1
+        if event["severity"] > incident.severity:
+            incident.severity = event["severity"]
+            for goal in incident.goals:
+                if goal.priority < incident.severity:
+                    goal.priority = incident.severity
@@ -0,0 +1,463 @@
+"""Streaming analysis of the text logs written by setup_logger
+
+parse_log() memory-maps a log and yields one LogRecord per known
+message, without reading the file into memory:
+
+  Alert / Merged into open incident / Plan / Damage confirmed /
+  Situation safe        DisasterResponseAgent decisions
+  state lines           FSM on_enter messages ("Assessing the situation")
+  EVENT type=...        SensorAgent detections (monitor_batch writes many
+                        per record, one per line, under a single header)
+  System online / Monitoring complete
+  older agent versions ("Received event: ...", "Transitioning to ...")
+
+parse_logs() walks a RotatingFileHandler set oldest first (path.N ..
+path.1, path). The whole file is matched by one compiled pattern, so
+per-line work happens in the regex engine. Pages already parsed are
+dropped from the mapping as the scan moves on, which keeps resident
+memory bounded however large the file is.
+
+TimelineBuilder folds records into per-incident timelines and latency
+Histograms (alert -> rescue dispatch, incident duration, time per FSM
+state). Only open incidents are held, unless keep=True:
+
+  builder = analyze_logs("response_events")
+  builder.summary()["dispatch_seconds"]["p99"]
+
+Log lines carry the agent id but not the event id. Each alert therefore
+opens a timeline for its agent. State lines go to the agent's oldest
+open incident whose current state can lead to the new one. This is exact
+for a sequential agent (the default). With workers > 1 it is a
+best-effort match, because concurrent incidents progress FIFO only
+while they share the same phase delays.
+
+asctime has millisecond resolution and no zone. Times are read as UTC,
+so durations are exact except across a DST change.
+"""
+
+import argparse
+import calendar
+import json
+import mmap
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from response_fsm import State
+from response_metrics import Histogram
+
+# record kinds
+ALERT = "alert"
+MERGED = "merged"
+PLAN = "plan"
+DAMAGE = "damage_confirmed"
+SAFE = "safe"
+TRANSITION = "state"
+SENSOR_EVENT = "event"
+ONLINE = "online"
+COMPLETE = "complete"
+
+# a header line, or a continuation line of a multi-line record
+_LINE = re.compile(rb"^(?:(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) - ([A-Z]+) - )?([^\r\n]*)\r?$", re.M)
+_ALERT = re.compile(rb"Alert: (\S+) at (.+) \(level (\d+)\)$")
+_MERGED = re.compile(rb"Merged into open incident at (.+) \(level (\d+), (\d+) merged\)$")
+_EVENT = re.compile(rb"EVENT type=(\S+) severity=(\d+) location=(.+) id=(\S+)$")
+_PLAN = b"Plan: Assess damage at "
+_DAMAGE = b"Damage confirmed - sending rescue to "
+_SAFE = b"Situation safe - no major action needed"
+_ONLINE = b"System online - monitoring..."
+_COMPLETE = b"Monitoring complete"
+_STATES = {
+    b"Waiting for alerts": State.IDLE,
+    b"Alert detected - checking details": State.MONITORING,
+    b"Assessing the situation": State.ASSESSING,
+    b"Sending response team": State.RESPONDING,
+    b"Recovery in progress": State.RECOVERING,
+}
+# earlier agent versions ("Received event: ...", "Transitioning to ASSESSING - ...")
+_RECEIVED = re.compile(rb"Received event: (\S+) severity=(\d+) at (.+)$")
+_GOAL_LOCATION = re.compile(rb"location=([^,)]+)")
+_LEGACY_STATES = {state.name.encode(): state for state in State}
+# states an incident can be in just before entering the key state
+_PREVIOUS = {
+    State.MONITORING: (State.IDLE,),
+    State.ASSESSING: (State.MONITORING,),
+    State.RESPONDING: (State.ASSESSING,),
+    State.RECOVERING: (State.RESPONDING,),
+    State.IDLE: (State.ASSESSING, State.RECOVERING),
+}
+RELEASE_BYTES = 64 << 20  # drop parsed pages from the mapping this often
+
+
+class LogRecord:
+    """One parsed log message. Fields a message does not carry are None."""
+    __slots__ = ("kind", "time", "level", "agent", "state", "ev_type", "location", "severity",
+                 "event_id", "merged")
+
+    def __init__(self, kind: str, time: float, level: str, agent: Optional[str] = None,
+                 state: Optional[State] = None, ev_type: Optional[str] = None,
+                 location: Optional[str] = None, severity: Optional[int] = None,
+                 event_id: Optional[str] = None, merged: Optional[int] = None):
+        self.kind = kind
+        self.time = time
+        self.level = level
+        self.agent = agent
+        self.state = state
+        self.ev_type = ev_type
+        self.location = location
+        self.severity = severity
+        self.event_id = event_id
+        self.merged = merged
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__
+                           if getattr(self, name) is not None)
+        return f"LogRecord({fields})"
+
+
+class _Strings(dict):
+    """bytes -> str cache for the small vocabularies (agents, levels,
+    locations, event types) so repeated values decode once."""
+
+    def __missing__(self, raw: bytes) -> str:
+        text = self[raw] = raw.decode("utf-8", "replace")
+        return text
+
+
+def rotated_files(path: str) -> List[str]:
+    """`path` and its RotatingFileHandler backups, oldest first."""
+    backups = []
+    n = 1
+    while os.path.exists(f"{path}.{n}"):
+        backups.append(f"{path}.{n}")
+        n += 1
+    files = backups[::-1]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def parse_log(path: str) -> Iterator[LogRecord]:
+    """Yield the known records of one log file in order."""
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield from _parse(mm)
+        finally:
+            mm.close()
+
+
+def parse_logs(path: str) -> Iterator[LogRecord]:
+    """Yield the records of `path` and its rotated backups, oldest first."""
+    for name in rotated_files(path):
+        yield from parse_log(name)
+
+
+def _parse(buf: mmap.mmap) -> Iterator[LogRecord]:
+    text = _Strings()
+    release = hasattr(mmap, "MADV_DONTNEED")
+    released = 0
+    days: Dict[bytes, int] = {}
+    stamp, second = None, 0
+    now, level = 0.0, "INFO"
+    for m in _LINE.finditer(buf):
+        asctime, ms, lvl, msg = m.groups()
+        if asctime is not None:
+            if asctime != stamp:  # convert each wall-clock second once
+                stamp = asctime
+                day = days.get(asctime[:10])
+                if day is None:
+                    day = days[asctime[:10]] = calendar.timegm(time.strptime(asctime[:10].decode(), "%Y-%m-%d"))
+                second = day + int(asctime[11:13]) * 3600 + int(asctime[14:16]) * 60 + int(asctime[17:19])
+            now = second + int(ms) / 1000
+            level = text[lvl]
+        elif not msg:
+            continue
+        record = _message(msg, now, level, text)
+        if record is not None:
+            yield record
+        if release and m.end() - released >= RELEASE_BYTES:
+            # page-aligned prefix we are done with
+            upto = (m.end() // mmap.PAGESIZE) * mmap.PAGESIZE
+            if upto > released:
+                buf.madvise(mmap.MADV_DONTNEED, released, upto - released)
+                released = upto
+
+
+def _message(msg: bytes, now: float, level: str, text: _Strings) -> Optional[LogRecord]:
+    if msg.startswith(b"EVENT "):
+        m = _EVENT.match(msg)
+        if m is None:
+            return None
+        ev_type, severity, location, event_id = m.groups()
+        return LogRecord(SENSOR_EVENT, now, level, ev_type=text[ev_type], severity=int(severity),
+                         location=text[location], event_id=event_id.decode())
+    if not msg.startswith(b"["):
+        return None
+    end = msg.find(b"] ")
+    if end < 0:
+        return None
+    agent = text[msg[1:end]]
+    body = msg[end + 2:]
+    state = _STATES.get(body)
+    if state is not None:
+        return LogRecord(TRANSITION, now, level, agent, state=state)
+    if body.startswith(b"Alert: "):
+        m = _ALERT.match(body)
+        if m is None:
+            return None
+        ev_type, location, severity = m.groups()
+        return LogRecord(ALERT, now, level, agent, ev_type=text[ev_type], location=text[location],
+                         severity=int(severity))
+    if body.startswith(_PLAN):
+        return LogRecord(PLAN, now, level, agent, location=text[body[len(_PLAN):]])
+    if body.startswith(_DAMAGE):
+        return LogRecord(DAMAGE, now, level, agent, location=text[body[len(_DAMAGE):]])
+    if body == _SAFE:
+        return LogRecord(SAFE, now, level, agent)
+    if body.startswith(b"Merged "):
+        m = _MERGED.match(body)
+        if m is None:
+            return None
+        location, severity, merged = m.groups()
+        return LogRecord(MERGED, now, level, agent, location=text[location], severity=int(severity),
+                         merged=int(merged))
+    if body == _ONLINE:
+        return LogRecord(ONLINE, now, level, agent)
+    if body == _COMPLETE:
+        return LogRecord(COMPLETE, now, level, agent)
+    return _legacy(body, agent, now, level, text)
+
+
+def _legacy(body: bytes, agent: str, now: float, level: str, text: _Strings) -> Optional[LogRecord]:
+    """Messages of earlier agent versions, still found in old logs."""
+    if body.startswith(b"Transitioning to "):
+        name = body[len(b"Transitioning to "):].split(b" ", 1)[0]
+        state = _LEGACY_STATES.get(name)
+        return None if state is None else LogRecord(TRANSITION, now, level, agent, state=state)
+    if body.startswith(b"Received event: "):
+        m = _RECEIVED.match(body)
+        if m is None:
+            return None
+        ev_type, severity, location = m.groups()
+        return LogRecord(ALERT, now, level, agent, ev_type=text[ev_type], location=text[location],
+                         severity=int(severity))
+    if body.startswith(b"Created goal: "):
+        m = _GOAL_LOCATION.search(body)
+        return None if m is None else LogRecord(PLAN, now, level, agent, location=text[m.group(1)])
+    if body.startswith(b"Damage confirmed! "):
+        m = _GOAL_LOCATION.search(body)
+        return None if m is None else LogRecord(DAMAGE, now, level, agent, location=text[m.group(1)])
+    if body.startswith(b"Damage assessment: threat level acceptable"):
+        return LogRecord(SAFE, now, level, agent)
+    if body.startswith(b"Starting, monitoring"):
+        return LogRecord(ONLINE, now, level, agent)
+    if body.startswith(b"Finished. "):
+        return LogRecord(COMPLETE, now, level, agent)
+    return None
+
+
+class Timeline:
+    """What one agent did about one alert."""
+    __slots__ = ("agent", "ev_type", "location", "severity", "opened", "closed", "outcome",
+                 "merged", "state", "entered", "entries")
+
+    def __init__(self, record: LogRecord):
+        self.agent = record.agent
+        self.ev_type = record.ev_type
+        self.location = record.location
+        self.severity = record.severity
+        self.opened = record.time
+        self.closed: Optional[float] = None
+        self.outcome: Optional[str] = None  # "rescue" or "safe"
+        self.merged = 0  # later alerts folded into this incident
+        self.state = State.IDLE  # current FSM state and when it was entered
+        self.entered = record.time
+        self.entries: List[Tuple[float, str]] = [(record.time, ALERT)]
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.closed is None else self.closed - self.opened
+
+    def to_dict(self) -> Dict:
+        return {
+            "agent": self.agent, "type": self.ev_type, "location": self.location,
+            "severity": self.severity, "opened": self.opened, "closed": self.closed,
+            "outcome": self.outcome, "merged": self.merged, "entries": list(self.entries),
+        }
+
+
+class TimelineBuilder:
+    """Per-incident timelines and latency histograms from LogRecords.
+
+    keep: retain closed timelines in `timelines` (otherwise only open
+          incidents are held, so memory does not grow with the log)
+    on_close: optional callback(timeline) as each incident closes
+    """
+
+    def __init__(self, keep: bool = False, on_close: Optional[Callable[[Timeline], None]] = None):
+        self.keep = keep
+        self.on_close = on_close
+        self.timelines: List[Timeline] = []
+        self._open: Dict[str, List[Timeline]] = {}  # agent -> open incidents, oldest first
+        self._last: Dict[str, Timeline] = {}  # agent -> incident touched last
+        self._closed: Dict[Tuple, Timeline] = {}  # (agent, type, location) -> last closed
+        self.records = 0
+        self.sensor_events = 0
+        self.closed = 0
+        self.merged = 0
+        self.abandoned = 0  # open when their agent restarted
+        self.unmatched = 0  # records no open incident could take
+        self.incident_seconds: Dict[str, Histogram] = {}  # by outcome
+        self.dispatch_seconds = Histogram()  # alert -> response team sent
+        self.state_seconds: Dict[State, Histogram] = {}
+
+    def feed(self, records: Iterable[LogRecord]) -> "TimelineBuilder":
+        for record in records:
+            self.add(record)
+        return self
+
+    def add(self, record: LogRecord) -> None:
+        self.records += 1
+        kind = record.kind
+        if kind == SENSOR_EVENT:
+            self.sensor_events += 1
+            return
+        agent = record.agent
+        if kind == ALERT:
+            timeline = Timeline(record)
+            self._open.setdefault(agent, []).append(timeline)
+            self._last[agent] = timeline
+        elif kind == TRANSITION:
+            self._transition(record)
+        elif kind == MERGED:
+            self._merge(record)
+        elif kind == ONLINE:
+            self.abandoned += len(self._open.pop(agent, ()))
+            self._last.pop(agent, None)
+        elif kind in (PLAN, DAMAGE, SAFE):
+            timeline = self._last.get(agent)
+            if timeline is None:
+                self.unmatched += 1
+                return
+            # "Situation safe" is logged after the IDLE line that closed it
+            timeline.entries.append((record.time, kind))
+
+    def _merge(self, record: LogRecord) -> None:
+        # the Alert just logged was folded into an incident with the same
+        # type and location, still open or closed within the coalescing window
+        agent = record.agent
+        incidents = self._open.get(agent, [])
+        alert = incidents.pop() if incidents and len(incidents[-1].entries) == 1 else None
+        key = (agent, alert.ev_type if alert else None, record.location)
+        target = None
+        for timeline in reversed(incidents):
+            if timeline.location == record.location and (alert is None or timeline.ev_type == key[1]):
+                target = timeline
+                break
+        else:
+            target = self._closed.get(key)
+        if target is None:
+            self.unmatched += 1
+            return
+        target.merged += 1
+        target.severity = record.severity
+        target.entries.append((record.time, MERGED))
+        self._last[agent] = target
+        self.merged += 1
+
+    def _transition(self, record: LogRecord) -> None:
+        agent, state = record.agent, record.state
+        incidents = self._open.get(agent)
+        if not incidents:
+            if state is not State.IDLE:  # IDLE also logs at startup
+                self.unmatched += 1
+            return
+        previous = _PREVIOUS[state]
+        for i, timeline in enumerate(incidents):
+            if timeline.state in previous:
+                break
+        else:
+            self.unmatched += 1
+            return
+        current = timeline.state
+        if current is not State.IDLE:
+            self._histogram(self.state_seconds, current).observe(record.time - timeline.entered)
+        timeline.state, timeline.entered = state, record.time
+        timeline.entries.append((record.time, state.value))
+        self._last[agent] = timeline
+        if state is State.RESPONDING:
+            timeline.outcome = "rescue"
+            self.dispatch_seconds.observe(record.time - timeline.opened)
+        elif state is State.IDLE:
+            if current is State.ASSESSING:
+                timeline.outcome = "safe"
+            del incidents[i]
+            timeline.closed = record.time
+            self._closed[agent, timeline.ev_type, timeline.location] = timeline
+            self.closed += 1
+            self._histogram(self.incident_seconds, timeline.outcome).observe(timeline.duration)
+            if self.keep:
+                self.timelines.append(timeline)
+            if self.on_close is not None:
+                self.on_close(timeline)
+
+    @staticmethod
+    def _histogram(table: Dict, key) -> Histogram:
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = Histogram()
+        return hist
+
+    @property
+    def open_incidents(self) -> int:
+        return sum(len(incidents) for incidents in self._open.values())
+
+    def summary(self) -> Dict:
+        return {
+            "records": self.records,
+            "sensor_events": self.sensor_events,
+            "incidents": self.closed,
+            "open": self.open_incidents,
+            "merged": self.merged,
+            "abandoned": self.abandoned,
+            "unmatched": self.unmatched,
+            "incident_seconds": {k: h.snapshot() for k, h in sorted(self.incident_seconds.items())},
+            "dispatch_seconds": self.dispatch_seconds.snapshot(),
+            "state_seconds": {s.value: h.snapshot() for s, h in self.state_seconds.items()},
+        }
+
+
+def analyze_logs(path: str, keep: bool = False) -> TimelineBuilder:
+    """Parse `path` and its rotated backups into a TimelineBuilder."""
+    return TimelineBuilder(keep=keep).feed(parse_logs(path))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize response agent logs")
+    parser.add_argument("log", help="log file; rotated backups (log.1, log.2, ...) are included")
+    parser.add_argument("--timelines", type=int, default=0, metavar="N",
+                        help="also print the first N incident timelines")
+    args = parser.parse_args(argv)
+
+    printed = 0
+
+    def show(timeline: Timeline) -> None:
+        nonlocal printed
+        if printed < args.timelines:
+            print(json.dumps(timeline.to_dict()))
+            printed += 1
+
+    builder = TimelineBuilder(on_close=show).feed(parse_logs(args.log))
+    print(json.dumps(builder.summary(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Non-blocking logging for agent hot paths
+
+In async mode a logger gets a single QueueHandler, which only enqueues
+the LogRecord. A background BatchingQueueListener thread drains the
+queue in batches, formats each record and writes every batch to the
+file/console handlers with one write and one flush per handler. The
+event loop thread never formats messages or touches files.
+
+Log calls should pass %-style arguments (logger.info("[%s] ...", x))
+rather than f-strings so that formatting is also deferred to the
+listener thread.
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List
+
+# Active listeners by logger name, so they can be flushed/stopped later
+_listeners: Dict[str, "BatchingQueueListener"] = {}
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that enqueues records as-is.
+
+    The stdlib QueueHandler formats the message in prepare() on the
+    calling thread; here the listener thread does it instead.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BatchingQueueListener(QueueListener):
+    """QueueListener that hands records to its handlers in batches."""
+
+    def __init__(self, q, *handlers, batch_size: int = 256, respect_handler_level: bool = True):
+        super().__init__(q, *handlers, respect_handler_level=respect_handler_level)
+        self.batch_size = batch_size
+        self.batches_written = 0
+
+    def _monitor(self) -> None:
+        q = self.queue
+        has_task_done = hasattr(q, "task_done")
+        stop = False
+        while not stop:
+            first = self.dequeue(True)
+            batch: List[logging.LogRecord] = []
+            if first is self._sentinel:
+                stop = True
+            else:
+                batch.append(first)
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._sentinel:
+                    stop = True
+                else:
+                    batch.append(record)
+            if batch:
+                self.handle_batch(batch)
+            if has_task_done:
+                for _ in range(len(batch) + stop):
+                    q.task_done()
+
+    def handle_batch(self, records: List[logging.LogRecord]) -> None:
+        """Write `records` to every handler, one flush per handler."""
+        self.batches_written += 1
+        for handler in self.handlers:
+            if self.respect_handler_level:
+                selected = [r for r in records if r.levelno >= handler.level]
+            else:
+                selected = records
+            if not selected:
+                continue
+            if isinstance(handler, logging.StreamHandler):
+                _write_stream_batch(handler, selected)
+            else:
+                for record in selected:
+                    handler.handle(record)
+
+
+def _write_stream_batch(handler: logging.StreamHandler, records: List[logging.LogRecord]) -> None:
+    chunks = []
+    pending = 0  # characters formatted but not yet written
+    rotating = isinstance(handler, RotatingFileHandler) and handler.maxBytes > 0
+    handler.acquire()
+    try:
+        for record in records:
+            if not handler.filter(record):
+                continue
+            msg = handler.format(record) + handler.terminator
+            if rotating and _should_rollover(handler, pending, msg):
+                # write what belongs in the current file before rotating
+                _flush_chunks(handler, chunks)
+                handler.doRollover()
+                pending = 0
+            chunks.append(msg)
+            pending += len(msg)
+        _flush_chunks(handler, chunks)
+    except Exception:
+        handler.handleError(records[-1])
+    finally:
+        handler.release()
+
+
+def _should_rollover(handler: RotatingFileHandler, pending: int, msg: str) -> bool:
+    """RotatingFileHandler.shouldRollover, counting the `pending` characters
+    of this batch that are still buffered."""
+    if handler.stream is None:  # delay=True
+        handler.stream = handler._open()
+    handler.stream.seek(0, 2)
+    size = handler.stream.tell() + pending
+    # a record longer than maxBytes on its own still goes into an empty file
+    return size > 0 and size + len(msg) >= handler.maxBytes
+
+
+def _flush_chunks(handler: logging.StreamHandler, chunks: List[str]) -> None:
+    if not chunks:
+        return
+    if handler.stream is None:  # FileHandler opened with delay=True
+        handler.stream = handler._open()
+    handler.stream.write("".join(chunks))
+    handler.stream.flush()
+    chunks.clear()
+
+
+def attach_handlers(logger: logging.Logger, handlers: List[logging.Handler],
+                    async_mode: bool = False, batch_size: int = 256) -> None:
+    """Attach `handlers` to `logger`, directly or behind a queue listener."""
+    if not async_mode:
+        for handler in handlers:
+            logger.addHandler(handler)
+        return
+    q = queue.SimpleQueue()
+    logger.addHandler(DeferredQueueHandler(q))
+    listener = BatchingQueueListener(q, *handlers, batch_size=batch_size)
+    listener.start()
+    _listeners[logger.name] = listener
+    atexit.register(stop_listener, logger)
+
+
+def stop_listener(logger: logging.Logger) -> None:
+    """Flush and stop the async listener of `logger`, if it has one."""
+    listener = _listeners.pop(logger.name, None)
+    if listener is not None:
+        listener.stop()
@@ -0,0 +1,200 @@
+"""Multiprocess scale-out of the environment + agent pipeline
+
+demo_run in disaster_response_agent.py drives one Environment and one
+agent on a single event loop, so it can only use one core. The launcher
+starts K worker processes instead. Each one runs its own Environment
+slice: a disjoint share of LOCATIONS and its own seed. Each slice feeds a
+local LocationDispatcher and agents, which shards over the slice's own
+locations so every agent of the worker gets work. When a worker finishes, it sends its
+goal/FSM counters back over a multiprocessing queue, and the launcher
+merges them into one report.
+
+With virtual=True every worker runs on a VirtualClock, so throughput is
+bound by CPU rather than sleeps and scales with the number of cores.
+
+Work is partitioned by location, so there are at most len(LOCATIONS)
+workers (7), and each worker can keep at most as many agents busy as its
+slice has locations.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from disaster_environment import Environment, LOCATIONS
+from event_dispatcher import LocationDispatcher
+from event_queues import OVERFLOW_POLICIES, QUEUE_MODES, make_event_queue
+from disaster_response_agent import DisasterResponseAgent
+from sim_clock import REAL_CLOCK, VirtualClock
+
+
+def _worker_logger(index: int, log_dir: Optional[str]) -> logging.Logger:
+    """File-only logger per worker (no console echo from K processes)."""
+    logger = logging.getLogger(f"response_agent.worker{index}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        if log_dir is None:
+            logger.addHandler(logging.NullHandler())
+        else:
+            handler = logging.FileHandler(os.path.join(log_dir, f"response_events.worker{index}"))
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+            logger.addHandler(handler)
+    return logger
+
+
+async def _run_slice(index: int, workers: int, config: Dict, clock) -> List[Dict]:
+    locations = LOCATIONS[index::workers]
+    seed = config["seed"] + index if config["seed"] is not None else None
+    env = Environment(seed=seed, base_probability=config["base_probability"],
+                      clock=clock, locations=locations)
+    bounds = ({"maxsize": config["queue_size"], "overflow": config["overflow"]}
+              if config["queue_size"] else {})
+    dispatcher = LocationDispatcher(config["agents_per_worker"],
+                                    lambda: make_event_queue(config["queue_mode"], clock=clock, **bounds),
+                                    locations=locations)
+    logger = _worker_logger(index, config["log_dir"])
+    agents = [
+        DisasterResponseAgent(f"ResponseAgent-{index + 1}.{i + 1}", q, logger=logger, clock=clock)
+        for i, q in enumerate(dispatcher.queues)
+    ]
+    interval = config["interval"]
+    cycles = int(config["duration"] / interval) + 3
+    await asyncio.gather(
+        env.run(dispatcher, interval=interval, duration=config["duration"]),
+        *(agent.run(cycles=cycles, timeout=interval + 0.05) for agent in agents),
+    )
+    return [dict(agent.stats(), events_dropped=dict(getattr(q, "shed_counts", {})))
+            for agent, q in zip(agents, dispatcher.queues)]
+
+
+def _worker_main(index: int, workers: int, config: Dict, results: mp.Queue) -> None:
+    """Process entry point: run one slice and report its counters."""
+    clock = VirtualClock() if config["virtual"] else REAL_CLOCK
+    started = time.perf_counter()
+    try:
+        agent_stats = clock.run(_run_slice(index, workers, config, clock))
+        results.put({
+            "worker": index,
+            "wall_seconds": time.perf_counter() - started,
+            "agents": agent_stats,
+        })
+    except Exception as e:  # report instead of leaving the launcher waiting
+        results.put({"worker": index, "error": repr(e)})
+
+
+def merge_stats(agent_stats: List[Dict]) -> Dict:
+    """Combine DisasterResponseAgent.stats() dicts into one summary.
+
+    events_by_agent keeps the per-agent event counts, so an idle shard shows up.
+    """
+    merged = {"agents": len(agent_stats), "events_processed": 0, "goals_total": 0, "transitions": 0,
+              "incidents_failed": 0,
+              "events_by_agent": {stats["agent_id"]: stats["events_processed"] for stats in agent_stats}}
+    counters = {key: Counter() for key in ("goals_by_type", "goals_by_status", "state_visits",
+                                           "events_dropped")}
+    for stats in agent_stats:
+        for key in ("events_processed", "goals_total", "transitions", "incidents_failed"):
+            merged[key] += stats[key]
+        for key, counter in counters.items():
+            counter.update(stats.get(key, {}))
+    merged.update({key: dict(counter) for key, counter in counters.items()})
+    return merged
+
+
+def _collect(procs: List[mp.Process], results: mp.Queue, poll: float = 0.5) -> List[Dict]:
+    """One report per worker; RuntimeError if a worker exits without one.
+
+    _worker_main reports its own exceptions, but a worker that is killed,
+    runs out of memory or exits via SystemExit never does.
+    """
+    reports: Dict[int, Dict] = {}
+    while len(reports) < len(procs):
+        try:
+            report = results.get(timeout=poll)
+        except queue.Empty:
+            dead = [i for i, p in enumerate(procs) if i not in reports and not p.is_alive()]
+            if not dead:
+                continue
+            try:  # a worker may have reported just before it exited
+                report = results.get(timeout=poll)
+            except queue.Empty:
+                for p in procs:
+                    if p.is_alive():
+                        p.terminate()
+                i = dead[0]
+                raise RuntimeError(f"worker {i} exited with code {procs[i].exitcode} "
+                                   "without reporting") from None
+        reports[report["worker"]] = report
+    return [reports[i] for i in range(len(procs))]
+
+
+def launch(workers: int = 2, duration: float = 3.0, interval: float = 0.3,
+           seed: Optional[int] = 42, base_probability: float = 0.5,
+           agents_per_worker: int = 1, virtual: bool = True,
+           log_dir: Optional[str] = None, queue_mode: str = "fifo",
+           queue_size: int = 0, overflow: str = "block") -> Dict:
+    """Run the pipeline across `workers` processes and return merged stats.
+
+    workers is capped at len(LOCATIONS), and agents_per_worker at the size
+    of the smallest slice, since slices are disjoint sets of locations.
+    """
+    if not 1 <= workers <= len(LOCATIONS):
+        raise ValueError(f"workers must be between 1 and {len(LOCATIONS)} (one location each at least)")
+    smallest = len(LOCATIONS) // workers
+    if not 1 <= agents_per_worker <= smallest:
+        raise ValueError(f"agents_per_worker must be between 1 and {smallest} for {workers} workers")
+    config = {
+        "duration": duration, "interval": interval, "seed": seed,
+        "base_probability": base_probability, "agents_per_worker": agents_per_worker,
+        "virtual": virtual, "log_dir": log_dir, "queue_mode": queue_mode,
+        "queue_size": queue_size, "overflow": overflow,
+    }
+    results = mp.Queue()
+    started = time.perf_counter()
+    procs = [mp.Process(target=_worker_main, args=(i, workers, config, results))
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    reports = _collect(procs, results)
+    for p in procs:
+        p.join()
+    wall = time.perf_counter() - started
+
+    errors = [r for r in reports if "error" in r]
+    if errors:
+        raise RuntimeError(f"worker(s) failed: {errors}")
+    summary = merge_stats([s for r in reports for s in r["agents"]])
+    summary["workers"] = workers
+    summary["wall_seconds"] = wall
+    summary["events_per_sec"] = summary["events_processed"] / wall if wall > 0 else 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the response pipeline on several cores")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help=f"worker processes (at most {len(LOCATIONS)}, one per location)")
+    parser.add_argument("--duration", type=float, default=3600.0, help="simulated seconds per worker")
+    parser.add_argument("--interval", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--agents-per-worker", type=int, default=1)
+    parser.add_argument("--real-time", action="store_true", help="sleep for real instead of simulating")
+    parser.add_argument("--queue-mode", choices=QUEUE_MODES, default="fifo")
+    parser.add_argument("--queue-size", type=int, default=0, help="bound each agent queue (0 = unbounded)")
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default="block")
+    args = parser.parse_args()
+
+    summary = launch(workers=min(args.workers, len(LOCATIONS)), duration=args.duration,
+                     interval=args.interval, seed=args.seed,
+                     agents_per_worker=args.agents_per_worker, virtual=not args.real_time,
+                     queue_mode=args.queue_mode, queue_size=args.queue_size,
+                     overflow=args.overflow)
+    print(json.dumps(summary, indent=2))
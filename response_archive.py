@@ -0,0 +1,52 @@
+"""Append-only on-disk archive for retired agent records
+
+GoalSet and FSM spill terminal goals and old history entries here once
+their in-memory retention limits are reached. Records are written as
+JSON lines so an archive can be inspected or streamed back later.
+"""
+
+import json
+from typing import Dict, Iterator
+
+
+class ArchiveWriter:
+    """Append-only JSON-lines archive with buffered writes."""
+
+    def __init__(self, path: str, flush_every: int = 256):
+        self.path = path
+        self.flush_every = flush_every
+        self.records_written = 0
+        self._buffer = []
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict) -> None:
+        """Queue one record; flushes to disk every `flush_every` records."""
+        self._buffer.append(json.dumps(record, separators=(",", ":")))
+        self.records_written += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._fh.write("\n".join(self._buffer) + "\n")
+            self._buffer.clear()
+        self._fh.flush()
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            self.flush()
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_archive(path: str) -> Iterator[Dict]:
+    """Stream records back from an archive file."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
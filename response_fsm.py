@@ -8,8 +8,12 @@ FSM states:
   RECOVERING -> IDLE
 """
 
+from collections import Counter, deque
 from enum import Enum
-from typing import Callable, Optional, Dict, Any
+from typing import TYPE_CHECKING, Callable, Optional, Dict, Any
+
+if TYPE_CHECKING:
+    from response_archive import ArchiveWriter
 
 
 class State(Enum):
@@ -22,11 +26,25 @@ class State(Enum):
 
 
 class FSM:
-    """Simple Finite State Machine for agent behavior."""
+    """Simple Finite State Machine for agent behavior.
+
+    history is a deque of the states entered, bounded or not (copy it with
+    list() to slice).
+    history_limit: keep only the most recent N states in `history`; older
+        entries are written to `archive` (if given) before being dropped.
+    transition_count and state_counts stay exact regardless of the limit.
+    """
 
-    def __init__(self, initial_state: State):
+    def __init__(self, initial_state: State, history_limit: Optional[int] = None,
+                 archive: Optional["ArchiveWriter"] = None):
+        self.initial_state = initial_state
         self.current_state = initial_state
-        self.history = [initial_state]
+        self.history_limit = history_limit
+        self.archive = archive
+        self.history = deque([initial_state])
+        self.transition_count = 0
+        self.state_counts: Counter = Counter([initial_state])
+        self._archived = 0  # history entries spilled so far
         self.transitions: Dict[State, Dict[str, State]] = {}
         self.on_enter_callbacks: Dict[State, Callable] = {}
         self.on_exit_callbacks: Dict[State, Callable] = {}
@@ -61,7 +79,7 @@ class FSM:
 
         # Transition
         self.current_state = next_state
-        self.history.append(next_state)
+        self._record_state(next_state)
 
         # Call enter callback
         if next_state in self.on_enter_callbacks:
@@ -69,14 +87,147 @@ class FSM:
 
         return True
 
+    def _record_state(self, state: State) -> None:
+        """Append to history, spilling the oldest entry past history_limit."""
+        self.history.append(state)
+        self.transition_count += 1
+        self.state_counts[state] += 1
+        if self.history_limit is not None and len(self.history) > self.history_limit:
+            old = self.history.popleft()
+            if self.archive is not None:
+                self.archive.write({"kind": "state", "index": self._archived, "state": old.value})
+            self._archived += 1
+
+    def restore_state(self, current_state: State, history, transition_count: int,
+                      state_counts: Counter, archived: int = 0) -> None:
+        """Put the machine back into a checkpointed state."""
+        self.current_state = current_state
+        self.history = deque(history)
+        self.transition_count = transition_count
+        self.state_counts = Counter(state_counts)
+        self._archived = archived
+
     def is_in_state(self, state: State) -> bool:
         """Check if FSM is in a specific state."""
         return self.current_state == state
 
+    def compile(self) -> "CompiledFSM":
+        """Freeze this FSM into an integer-indexed CompiledFSM.
+
+        The compiled machine continues from the current state and takes
+        over this FSM's history and counters; keep using it instead.
+        """
+        return CompiledFSM(self)
+
+
+class CompiledFSM(FSM):
+    """Frozen FSM driven by an integer transition table.
+
+    States are indexed in State declaration order and event names are
+    interned to small ints (see `event_ids`), so a step is two list
+    lookups. Callbacks are pre-bound per state index, and a context dict
+    is only allocated when a callback will actually receive it. History
+    and callback semantics match FSM.handle_event.
+    """
+
+    def __init__(self, fsm: FSM):
+        self.initial_state = fsm.initial_state
+        self.current_state = fsm.current_state
+        self.history_limit = fsm.history_limit
+        self.archive = fsm.archive
+        self.history = fsm.history
+        self.transition_count = fsm.transition_count
+        self.state_counts = fsm.state_counts
+        self._archived = fsm._archived
+        self.transitions = {s: dict(t) for s, t in fsm.transitions.items()}
+        self.on_enter_callbacks = dict(fsm.on_enter_callbacks)
+        self.on_exit_callbacks = dict(fsm.on_exit_callbacks)
+
+        self.states = list(State)
+        self.state_index = {state: i for i, state in enumerate(self.states)}
+        self.event_ids: Dict[str, int] = {}
+        for targets in self.transitions.values():
+            for event in targets:
+                self.event_ids.setdefault(event, len(self.event_ids))
+        self.table = [[-1] * len(self.event_ids) for _ in self.states]
+        for from_state, targets in self.transitions.items():
+            row = self.table[self.state_index[from_state]]
+            for event, to_state in targets.items():
+                row[self.event_ids[event]] = self.state_index[to_state]
+        self._bind_callbacks()
+        self.state_id = self.state_index[self.current_state]
+
+    def _bind_callbacks(self) -> None:
+        self._enter = [self.on_enter_callbacks.get(s) for s in self.states]
+        self._exit = [self.on_exit_callbacks.get(s) for s in self.states]
+
+    def add_transition(self, from_state: State, event: str, to_state: State) -> None:
+        raise RuntimeError("compiled FSM is frozen; add transitions before compile()")
+
+    def on_enter(self, state: State, callback: Callable) -> None:
+        super().on_enter(state, callback)
+        self._enter[self.state_index[state]] = callback
+
+    def on_exit(self, state: State, callback: Callable) -> None:
+        super().on_exit(state, callback)
+        self._exit[self.state_index[state]] = callback
+
+    def spawn(self, initial_state: Optional[State] = None) -> "CompiledFSM":
+        """New machine sharing this table and callbacks, with its own
+        state, history and counters (cheaper than compiling again)."""
+        state = initial_state or self.initial_state
+        twin = object.__new__(CompiledFSM)
+        twin.__dict__.update(self.__dict__)
+        twin.initial_state = state
+        twin.current_state = state
+        twin.state_id = self.state_index[state]
+        twin.history = deque([state])
+        twin.transition_count = 0
+        twin.state_counts = Counter([state])
+        twin._archived = 0
+        # callbacks registered on the twin must not leak back
+        twin.on_enter_callbacks = dict(self.on_enter_callbacks)
+        twin.on_exit_callbacks = dict(self.on_exit_callbacks)
+        twin._bind_callbacks()
+        return twin
+
+    def restore_state(self, current_state: State, history, transition_count: int,
+                      state_counts: Counter, archived: int = 0) -> None:
+        super().restore_state(current_state, history, transition_count, state_counts, archived)
+        self.state_id = self.state_index[current_state]
+
+    def handle_event(self, event: str, context: Optional[Dict[str, Any]] = None) -> bool:
+        """Process an event; transition if possible. Return True if transition occurred."""
+        event_id = self.event_ids.get(event)
+        if event_id is None:
+            return False
+        return self.fire(event_id, context)
+
+    def fire(self, event_id: int, context: Optional[Dict[str, Any]] = None) -> bool:
+        """handle_event for an interned event id from `event_ids`."""
+        current = self.state_id
+        next_id = self.table[current][event_id]
+        if next_id < 0:
+            return False
+        exit_cb = self._exit[current]
+        enter_cb = self._enter[next_id]
+        if context is None and (exit_cb or enter_cb):
+            context = {}
+        if exit_cb:
+            exit_cb(context)
+        self.state_id = next_id
+        state = self.states[next_id]
+        self.current_state = state
+        self._record_state(state)
+        if enter_cb:
+            enter_cb(context)
+        return True
+
 
-def build_disaster_response_fsm() -> FSM:
+def build_disaster_response_fsm(history_limit: Optional[int] = None,
+                                archive: Optional["ArchiveWriter"] = None) -> FSM:
     """Build and return a configured FSM for disaster response."""
-    fsm = FSM(State.IDLE)
+    fsm = FSM(State.IDLE, history_limit=history_limit, archive=archive)
 
     # Define transitions
     fsm.add_transition(State.IDLE, "event_detected", State.MONITORING)
@@ -109,4 +260,4 @@ if __name__ == "__main__":
     fsm.handle_event("recovery_done")
     print(f"After recovery_done: {fsm.current_state}")
 
-    print(f"\nFSM history: {fsm.history}")
+    print(f"\nFSM history: {list(fsm.history)}")
@@ -4,9 +4,14 @@ Agents pursue goals in response to environmental events.
 This module defines goal types and lifecycle.
 """
 
+import heapq
+from collections import Counter, deque
 from enum import Enum
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional, Union, ValuesView
+
+if TYPE_CHECKING:
+    from response_archive import ArchiveWriter
 
 
 class GoalStatus(Enum):
@@ -26,43 +31,272 @@ class GoalType(Enum):
     RECOVER = "recover"
 
 
-@dataclass
+@dataclass(slots=True, init=False)
 class Goal:
     """A single goal instance."""
     goal_type: GoalType
     location: str
     priority: int  # 1 (low) to 5 (critical)
     status: GoalStatus = GoalStatus.PENDING
-    event_id: Optional[str] = None  # triggering event id
+    event_id: Optional[Union[str, int]] = None  # triggering event id
+    created_at: Optional[float] = field(default=None, repr=False, compare=False)  # clock time
+    # set by the owning GoalSet
+    _owner: Optional["GoalSet"] = field(default=None, repr=False, compare=False)
+    _seq: int = field(default=-1, repr=False, compare=False)
+
+    def __init__(self, goal_type: GoalType, location: str, priority: int,
+                 status: GoalStatus = GoalStatus.PENDING, event_id: Optional[Union[str, int]] = None,
+                 created_at: Optional[float] = None):
+        # written out so construction bypasses __setattr__ below; going
+        # through the hook made Goal() ~9x slower
+        init = object.__setattr__
+        init(self, "goal_type", goal_type)
+        init(self, "location", location)
+        init(self, "priority", priority)
+        init(self, "status", status)
+        init(self, "event_id", event_id)
+        init(self, "created_at", created_at)
+        init(self, "_owner", None)
+        init(self, "_seq", -1)
 
     def __str__(self) -> str:
         return f"Goal(type={self.goal_type.value}, location={self.location}, priority={self.priority}, status={self.status.value})"
 
+    def __setattr__(self, name, value):
+        # Let the owning GoalSet keep its indexes in step with direct
+        # assignments such as `goal.status = GoalStatus.ACTIVE`. Only
+        # status and priority are indexed; every other field is a plain write.
+        if name != "status" and name != "priority":
+            object.__setattr__(self, name, value)
+            return
+        owner = self._owner
+        if owner is None:
+            object.__setattr__(self, name, value)
+            return
+        old = getattr(self, name)
+        object.__setattr__(self, name, value)
+        if old != value:
+            owner._reindex(self, name, old)
+
 
 class GoalSet:
-    """Manager for active goals."""
-    def __init__(self):
-        self.goals = []
+    """Manager for active goals.
+
+    Goals are indexed by status, event_id and location, and ACTIVE goals
+    sit in per-priority buckets (priority is 1-5), so adding, status
+    changes, lookups and fetching the top active goal never scan the
+    whole set.
+
+    max_terminal: keep at most this many COMPLETED/FAILED goals in memory;
+        older ones are dropped (oldest first) after being written to
+        `archive`, if given. None keeps everything.
+    archive: optional ArchiveWriter receiving evicted goals
+
+    total_added, type_counts and status_counts count every goal ever added,
+    including evicted ones.
+
+    After track_changes(), the seqs of goals added, changed or evicted are
+    collected until take_changes() (used for incremental checkpoints).
+    """
+    TERMINAL = (GoalStatus.COMPLETED, GoalStatus.FAILED)
+
+    def __init__(self, max_terminal: Optional[int] = None, archive: Optional["ArchiveWriter"] = None):
+        self.max_terminal = max_terminal
+        self.archive = archive
+        self.total_added = 0
+        self.type_counts: Counter = Counter()
+        self.status_counts: Counter = Counter()
+        self._terminal = deque()  # seqs in the order they became terminal
+        self._goals: Dict[int, Goal] = {}  # seq -> goal, in insertion order
+        self._next_seq = 0
+        self._by_status: Dict[GoalStatus, Dict[int, Goal]] = {s: {} for s in GoalStatus}
+        self._by_event: Dict[Optional[str], Dict[int, Goal]] = {}
+        self._by_location: Dict[str, Dict[int, Goal]] = {}
+        # priority -> [{seq: goal}, heap of seqs with lazy deletion, removals since compaction]
+        self._active: Dict[int, list] = {}
+        self._changed: Optional[set] = None  # seqs touched since take_changes()
+
+    @property
+    def goals(self) -> ValuesView[Goal]:
+        """All registered goals in insertion order, as a live read-only view
+        (no copy; wrap it in list() to index or to keep a snapshot).
+
+        Use add_goal() to register goals; there is no list to append to.
+        """
+        return self._goals.values()
+
+    def __len__(self) -> int:
+        return len(self._goals)
+
+    def add_goal(self, goal: Goal, seq: Optional[int] = None) -> None:
+        """Register a new goal.
+
+        seq: keep this sequence number (when restoring a checkpoint)
+        """
+        if seq is None:
+            seq = self._next_seq
+        self._next_seq = max(self._next_seq, seq + 1)
+        object.__setattr__(goal, "_owner", self)
+        object.__setattr__(goal, "_seq", seq)
+        self._goals[seq] = goal
+        self._by_status[goal.status][seq] = goal
+        self._by_event.setdefault(goal.event_id, {})[seq] = goal
+        self._by_location.setdefault(goal.location, {})[seq] = goal
+        self.total_added += 1
+        self.type_counts[goal.goal_type] += 1
+        self.status_counts[goal.status] += 1
+        if self._changed is not None:
+            self._changed.add(seq)
+        if goal.status == GoalStatus.ACTIVE:
+            self._activate(goal)
+        elif goal.status in self.TERMINAL:
+            self._retire(goal)
 
-    def add_goal(self, goal: Goal) -> None:
-        """Register a new goal."""
-        self.goals.append(goal)
+    def track_changes(self) -> None:
+        """Start collecting the seqs of added, changed and evicted goals."""
+        self._changed = set()
+
+    def take_changes(self):
+        """Return (goals added or changed, seqs evicted) since the last call."""
+        changed, self._changed = self._changed or set(), set()
+        goals = self._goals
+        live = [goals[seq] for seq in sorted(changed) if seq in goals]
+        return live, [seq for seq in changed if seq not in goals]
 
     def get_active_goals(self) -> list:
         """Return all ACTIVE goals, sorted by priority (descending)."""
-        active = [g for g in self.goals if g.status == GoalStatus.ACTIVE]
-        return sorted(active, key=lambda g: g.priority, reverse=True)
+        active = []
+        for priority in sorted(self._active, reverse=True):
+            bucket = self._active[priority][0]
+            active.extend(bucket[seq] for seq in sorted(bucket))
+        return active
+
+    def highest_active(self) -> Optional[Goal]:
+        """Return the highest-priority ACTIVE goal (oldest first), or None."""
+        if not self._active:
+            return None
+        bucket, heap, _ = self._active[max(self._active)]
+        while heap[0] not in bucket:
+            heapq.heappop(heap)
+        return bucket[heap[0]]
+
+    def pop_highest_active(self) -> Optional[Goal]:
+        """Complete and return the highest-priority ACTIVE goal, or None."""
+        goal = self.highest_active()
+        if goal is not None:
+            self.mark_completed(goal)
+        return goal
+
+    def get_by_status(self, status: GoalStatus) -> List[Goal]:
+        """Return goals with `status` in insertion order."""
+        return list(self._by_status[status].values())
+
+    def get_by_event_id(self, event_id: str) -> List[Goal]:
+        """Return goals triggered by `event_id`."""
+        return list(self._by_event.get(event_id, {}).values())
+
+    def get_by_location(self, location: str) -> List[Goal]:
+        """Return goals at `location`."""
+        return list(self._by_location.get(location, {}).values())
 
     def mark_completed(self, goal: Goal) -> None:
         """Mark a goal as completed."""
-        if goal in self.goals:
+        if getattr(goal, "_owner", None) is self:
             goal.status = GoalStatus.COMPLETED
 
     def mark_failed(self, goal: Goal) -> None:
         """Mark a goal as failed."""
-        if goal in self.goals:
+        if getattr(goal, "_owner", None) is self:
             goal.status = GoalStatus.FAILED
 
+    def export_counters(self) -> Dict:
+        """Lifetime counters and retention order as plain data."""
+        return {
+            "total_added": self.total_added,
+            "type_counts": {t.value: n for t, n in self.type_counts.items()},
+            "status_counts": {s.value: n for s, n in self.status_counts.items()},
+            "terminal": list(self._terminal),
+        }
+
+    def restore_counters(self, counters: Dict) -> None:
+        """Inverse of export_counters, after the live goals are re-added."""
+        self.total_added = counters["total_added"]
+        self.type_counts = Counter({GoalType(k): n for k, n in counters["type_counts"].items()})
+        self.status_counts = Counter({GoalStatus(k): n for k, n in counters["status_counts"].items()})
+        self._terminal = deque(seq for seq in counters["terminal"] if seq in self._goals)
+
+    def _activate(self, goal: Goal) -> None:
+        entry = self._active.setdefault(goal.priority, [{}, [], 0])
+        entry[0][goal._seq] = goal
+        heapq.heappush(entry[1], goal._seq)
+
+    def _deactivate(self, goal: Goal, priority: int) -> None:
+        entry = self._active[priority]
+        bucket = entry[0]
+        del bucket[goal._seq]
+        if not bucket:
+            del self._active[priority]
+            return
+        # dicts never shrink on delete and the heap deletes lazily, so
+        # compact once removals outnumber live entries
+        entry[2] += 1
+        if entry[2] > 2 * len(bucket) + 64:
+            entry[0] = dict(bucket)
+            entry[1] = sorted(bucket)
+            entry[2] = 0
+
+    def _retire(self, goal: Goal) -> None:
+        """Track a goal that reached a terminal status; evict past the cap."""
+        if self.max_terminal is None:
+            return
+        self._terminal.append(goal._seq)
+        while len(self._terminal) > self.max_terminal:
+            old = self._goals.get(self._terminal.popleft())
+            if old is not None and old.status in self.TERMINAL:
+                self._evict(old)
+
+    def _evict(self, goal: Goal) -> None:
+        seq = goal._seq
+        if self._changed is not None:
+            self._changed.add(seq)
+        del self._goals[seq]
+        del self._by_status[goal.status][seq]
+        for index, key in ((self._by_event, goal.event_id), (self._by_location, goal.location)):
+            entries = index[key]
+            del entries[seq]
+            if not entries:
+                del index[key]
+        object.__setattr__(goal, "_owner", None)
+        if self.archive is not None:
+            self.archive.write({
+                "kind": "goal",
+                "seq": seq,
+                "goal_type": goal.goal_type.value,
+                "location": goal.location,
+                "priority": goal.priority,
+                "status": goal.status.value,
+                "event_id": goal.event_id,
+            })
+
+    def _reindex(self, goal: Goal, field: str, old) -> None:
+        """Update indexes after `goal.<field>` changed from `old`."""
+        if self._changed is not None:
+            self._changed.add(goal._seq)
+        if field == "status":
+            del self._by_status[old][goal._seq]
+            self._by_status[goal.status][goal._seq] = goal
+            self.status_counts[old] -= 1
+            self.status_counts[goal.status] += 1
+            if old == GoalStatus.ACTIVE:
+                self._deactivate(goal, goal.priority)
+            if goal.status == GoalStatus.ACTIVE:
+                self._activate(goal)
+            elif goal.status in self.TERMINAL and old not in self.TERMINAL:
+                self._retire(goal)
+        elif goal.status == GoalStatus.ACTIVE:
+            self._deactivate(goal, old)
+            self._activate(goal)
+
 
 if __name__ == "__main__":
     # demo
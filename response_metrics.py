@@ -0,0 +1,165 @@
+"""Lightweight in-process metrics for the response pipeline
+
+Environment, SensorAgent and DisasterResponseAgent accept an optional
+`metrics` registry and record:
+
+  events_emitted_total{type}     events put on the queue by Environment
+  producer_queue_depth           queue size after Environment's last put
+  consumer_queue_depth{agent}    queue size left after an agent's last get
+  queue_wait_seconds             event timestamp -> dequeue by an agent
+  state_dwell_seconds{state}     time each FSM spent in a State
+  goal_completion_seconds{type}  goal creation -> completion
+  agent_timeouts_total           queue polls that timed out
+  incidents_failed_total         wheel incidents aborted by a phase error
+  events_dropped_total{reason}   events shed by a bounded queue
+
+Histograms use fixed exponential buckets, so an observation is one
+bisect and a counter increment. Read results with snapshot(), to_json()
+or to_prometheus(), or scrape them via serve() on a local port.
+"""
+
+import asyncio
+import json
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+# 100us .. ~105s in powers of two, plus +Inf
+DEFAULT_BOUNDS: Tuple[float, ...] = tuple(1e-4 * 2 ** i for i in range(21))
+
+
+class Histogram:
+    """Fixed-bucket histogram with count/sum/min/max."""
+
+    def __init__(self, bounds: Tuple[float, ...] = DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile: upper bound of the bucket holding rank q."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _key(name: str, labels: Dict[str, str]) -> Tuple[str, Tuple]:
+    return name, tuple(sorted(labels.items()))
+
+
+def _render(name: str, labels: Tuple, extra: Optional[Tuple] = None) -> str:
+    pairs = labels + (extra or ())
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """Registry of counters, gauges and histograms keyed by name + labels."""
+
+    def __init__(self):
+        self.counters: Dict[Tuple, float] = {}
+        self.gauges: Dict[Tuple, float] = {}
+        self.histograms: Dict[Tuple, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        self.gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram()
+        hist.observe(value)
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self.counters.get(_key(name, labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self.histograms.get(_key(name, labels))
+
+    def snapshot(self) -> Dict:
+        """Plain-data view of every metric."""
+        return {
+            "counters": {_render(n, l): v for (n, l), v in self.counters.items()},
+            "gauges": {_render(n, l): v for (n, l), v in self.gauges.items()},
+            "histograms": {_render(n, l): h.snapshot() for (n, l), h in self.histograms.items()},
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Render in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+            for name in sorted({n for n, _ in metrics}):
+                lines.append(f"# TYPE {name} {kind}")
+                for (n, labels), value in metrics.items():
+                    if n == name:
+                        lines.append(f"{_render(n, labels)} {value}")
+        for name in sorted({n for n, _ in self.histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), hist in self.histograms.items():
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(hist.bounds + (float("inf"),), hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{_render(n + '_bucket', labels, (('le', le),))} {cumulative}")
+                lines.append(f"{_render(n + '_sum', labels)} {hist.sum}")
+                lines.append(f"{_render(n + '_count', labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9108) -> asyncio.AbstractServer:
+        """Serve metrics over HTTP: /metrics.json as JSON, anything else as
+        Prometheus text. Returns the started asyncio server."""
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            request = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            path = request.split()[1] if len(request.split()) > 1 else b"/"
+            if path.endswith(b".json"):
+                body, ctype = self.to_json(), "application/json"
+            else:
+                body, ctype = self.to_prometheus(), "text/plain; version=0.0.4"
+            data = body.encode("utf-8")
+            writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {ctype}\r\n"
+                         f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode() + data)
+            await writer.drain()
+            writer.close()
+
+        return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,126 @@
+"""Pluggable clocks for the disaster response simulation
+
+Environment, SensorAgent and DisasterResponseAgent take a `clock` so the
+same code can run against wall time or a simulated timeline:
+
+  Clock         -> real time (time.time / asyncio.sleep)
+  VirtualClock  -> discrete-event time; whenever every task is waiting,
+                   the event loop jumps straight to the next timer instead
+                   of sleeping, so a simulated day runs as fast as the CPU
+                   allows with identical event ordering and timestamps.
+"""
+
+import asyncio
+import selectors
+import time
+from typing import Optional
+
+
+class Clock:
+    """Wall clock: real timestamps and real sleeps."""
+
+    def time(self) -> float:
+        """Current time as a unix timestamp."""
+        return time.time()
+
+    async def sleep(self, delay: float) -> None:
+        """Suspend the calling task for `delay` seconds."""
+        await asyncio.sleep(delay)
+
+    def run(self, coro):
+        """Run `coro` to completion on a fresh event loop."""
+        return asyncio.run(coro)
+
+
+class _VirtualSelector:
+    """Selector wrapper that advances virtual time instead of blocking.
+
+    Real file descriptors (the loop's self-pipe, sockets) are still polled,
+    but never waited on while timers are pending.
+    """
+
+    def __init__(self, clock: "VirtualClock"):
+        self._clock = clock
+        self._selector = selectors.DefaultSelector()
+
+    def select(self, timeout: Optional[float] = None):
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None:
+            # nothing scheduled: only outside I/O can wake us
+            return self._selector.select(None)
+        self._clock.advance(timeout)
+        return []
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class _VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose notion of time is driven by a VirtualClock."""
+
+    def __init__(self, clock: "VirtualClock"):
+        self._virtual_clock = clock
+        super().__init__(_VirtualSelector(clock))
+        # timers due within a microsecond fire together; this also absorbs
+        # float rounding when the clock is advanced by `when - now`
+        self._clock_resolution = 1e-6
+
+    def time(self) -> float:
+        return self._virtual_clock.elapsed
+
+
+class VirtualClock(Clock):
+    """Simulated clock that fast-forwards through idle time.
+
+    start: simulated unix timestamp at which the run begins
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.start = float(start)
+        # seconds since start; kept separate so timer arithmetic stays
+        # precise even when `start` is a large unix timestamp
+        self.elapsed = 0.0
+
+    def time(self) -> float:
+        return self.start + self.elapsed
+
+    def advance(self, delta: float) -> None:
+        """Move simulated time forward by `delta` seconds."""
+        if delta > 0:
+            self.elapsed += delta
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        """Create an event loop whose timers run on this clock."""
+        return _VirtualEventLoop(self)
+
+    def run(self, coro):
+        """Run `coro` to completion in simulated time."""
+        loop = self.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            return loop.run_until_complete(coro)
+        finally:
+            try:
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
+
+
+# Shared default used when no clock is passed in
+REAL_CLOCK = Clock()
+
+
+if __name__ == "__main__":
+    # demo: one simulated hour finishes almost instantly
+    async def tick(clock: Clock):
+        for _ in range(4):
+            await clock.sleep(900)
+            print(f"simulated time: {clock.time():.0f}s")
+
+    clock = VirtualClock()
+    wall = time.perf_counter()
+    clock.run(tick(clock))
+    print(f"wall time: {time.perf_counter() - wall:.3f}s")
@@ -0,0 +1,177 @@
+"""Rolling-window analytics over the event stream
+
+StreamAnalytics taps the Environment -> agent hop as a listener:
+
+  analytics = StreamAnalytics(windows=(60, 300), clock=clock)
+  env.add_listener(analytics.observe)
+  ...
+  analytics.count(300, location="Nima")          # events in the last 5 min
+  analytics.count(60, ev_type="flood")
+  analytics.max_severity(300, "Circle")
+
+Each window is a ring of `buckets` sub-intervals. A bucket holds counts
+per (location code, type code) and per (location code, severity).
+Running totals, plus per-location and per-type marginals, are kept next
+to the ring. Observing an event touches one bucket and the totals.
+Expiring a bucket subtracts only the cells it touched from the totals.
+Queries read the totals directly, so nothing depends on history length.
+The window slides with bucket granularity: a query covers the current,
+partly elapsed bucket plus the `buckets - 1` before it, i.e. between
+`window - width` and `window` seconds (width = window / buckets).
+
+Events are placed by their own timestamp. Events older than the window
+are counted in `late` and otherwise ignored.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from disaster_environment import EVENT_TYPES, LOCATION_CODES, LOCATIONS, TYPE_CODES, Event
+from sim_clock import Clock, REAL_CLOCK
+
+SEVERITIES = 5
+_NT = len(EVENT_TYPES)
+_NL = len(LOCATIONS)
+
+
+class RollingWindow:
+    """Bucketed sliding-window counters for one window length."""
+
+    def __init__(self, window: float, buckets: int = 60):
+        if window <= 0 or buckets < 1:
+            raise ValueError("window must be > 0 and buckets >= 1")
+        self.window = window
+        self.width = window / buckets
+        self._n = buckets
+        # per bucket, only the cells it touched: {loc * _NT + type: n} and
+        # {loc * SEVERITIES + sev - 1: n}, so expiry costs what was added
+        self._types: List[Dict[int, int]] = [{} for _ in range(buckets)]
+        self._sevs: List[Dict[int, int]] = [{} for _ in range(buckets)]
+        self._head: Optional[int] = None  # absolute index of the newest bucket
+        self.by_type_location = [0] * (_NL * _NT)
+        self.by_severity_location = [0] * (_NL * SEVERITIES)
+        self.by_location = [0] * _NL
+        self.by_type = [0] * _NT
+        self.total = 0
+        self.late = 0
+
+    def advance(self, now: float) -> None:
+        """Expire buckets that have slid out of the window at `now`."""
+        index = int(now // self.width)
+        head = self._head
+        if head is None:
+            self._head = index
+            return
+        if index <= head:
+            return
+        for absolute in range(head + 1, min(index, head + self._n) + 1):
+            self._expire(absolute % self._n)
+        self._head = index
+
+    def _expire(self, slot: int) -> None:
+        types, sevs = self._types[slot], self._sevs[slot]
+        if not types:
+            return
+        totals, sev_totals = self.by_type_location, self.by_severity_location
+        for i, n in types.items():
+            totals[i] -= n
+            self.by_location[i // _NT] -= n
+            self.by_type[i % _NT] -= n
+            self.total -= n
+        for i, n in sevs.items():
+            sev_totals[i] -= n
+        types.clear()
+        sevs.clear()
+
+    def add(self, timestamp: float, location: int, ev_type: int, severity: int) -> None:
+        index = int(timestamp // self.width)
+        self.advance(timestamp)
+        if index <= self._head - self._n:
+            self.late += 1
+            return
+        slot = index % self._n
+        cell = location * _NT + ev_type
+        sev_cell = location * SEVERITIES + min(SEVERITIES, max(1, severity)) - 1
+        types, sevs = self._types[slot], self._sevs[slot]
+        types[cell] = types.get(cell, 0) + 1
+        sevs[sev_cell] = sevs.get(sev_cell, 0) + 1
+        self.by_type_location[cell] += 1
+        self.by_severity_location[sev_cell] += 1
+        self.by_location[location] += 1
+        self.by_type[ev_type] += 1
+        self.total += 1
+
+    def max_severity(self, location: int) -> int:
+        """Highest severity seen at `location` in the window (0 if none)."""
+        base = location * SEVERITIES
+        for sev in range(SEVERITIES, 0, -1):
+            if self.by_severity_location[base + sev - 1]:
+                return sev
+        return 0
+
+
+class StreamAnalytics:
+    """Sliding-window event counts and severity maxima per location/type.
+
+    windows: window lengths in seconds
+    buckets: sub-intervals per window (resolution = window / buckets)
+    clock: used to expire old buckets at query time
+    """
+
+    def __init__(self, windows: Iterable[float] = (60.0, 300.0, 900.0), buckets: int = 60,
+                 clock: Optional[Clock] = None):
+        self.clock = clock or REAL_CLOCK
+        self.windows: Dict[float, RollingWindow] = {float(w): RollingWindow(w, buckets) for w in windows}
+        self.observed = 0
+
+    def observe(self, event) -> None:
+        """Add one event; usable as an Environment/ReplayEnvironment listener."""
+        if isinstance(event, Event):
+            location, ev_type = event.location_code, event.type_code
+        else:
+            location, ev_type = LOCATION_CODES[event["location"]], TYPE_CODES[event["type"]]
+        timestamp, severity = event["timestamp"], event["severity"]
+        for window in self.windows.values():
+            window.add(timestamp, location, ev_type, severity)
+        self.observed += 1
+
+    def _window(self, window: float) -> RollingWindow:
+        rolling = self.windows[float(window)]
+        rolling.advance(self.clock.time())
+        return rolling
+
+    def count(self, window: float, location: Optional[str] = None, ev_type: Optional[str] = None) -> int:
+        """Events in the last `window` seconds, optionally for one
+        location and/or event type."""
+        rolling = self._window(window)
+        if location is None and ev_type is None:
+            return rolling.total
+        if ev_type is None:
+            return rolling.by_location[LOCATION_CODES[location]]
+        if location is None:
+            return rolling.by_type[TYPE_CODES[ev_type]]
+        return rolling.by_type_location[LOCATION_CODES[location] * _NT + TYPE_CODES[ev_type]]
+
+    def max_severity(self, window: float, location: str) -> int:
+        """Highest severity at `location` in the last `window` seconds (0 if none)."""
+        return self._window(window).max_severity(LOCATION_CODES[location])
+
+    def rate(self, window: float, location: Optional[str] = None) -> float:
+        """Events per second over the last `window` seconds."""
+        return self.count(window, location) / window
+
+    def snapshot(self, window: float) -> Dict:
+        """Per-location counts, type breakdown and max severity."""
+        rolling = self._window(window)
+        locations: List[Dict] = []
+        for code, name in enumerate(LOCATIONS):
+            if not rolling.by_location[code]:
+                continue
+            locations.append({
+                "location": name,
+                "events": rolling.by_location[code],
+                "max_severity": rolling.max_severity(code),
+                "by_type": {EVENT_TYPES[t]: n for t in range(_NT)
+                            if (n := rolling.by_type_location[code * _NT + t])},
+            })
+        return {"window": window, "events": rolling.total, "late": rolling.late,
+                "locations": locations}
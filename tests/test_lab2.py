@@ -1,5 +1,8 @@
 import asyncio
-from disaster_environment import Environment
+
+import pytest
+
+from disaster_environment import Environment, LOCATIONS
 
 
 def test_generate_event_structure():
@@ -27,3 +30,336 @@ def test_env_puts_events_in_queue():
     assert isinstance(events, list)
     # Could be 0..n depending on randomness but we expect at least 0-5 events
     assert len(events) >= 0
+
+
+def test_bulk_columns_are_reproducible():
+    a = Environment(seed=3, base_probability=0.5).generate_columns(1000, start=0.0)
+    b = Environment(seed=3, base_probability=0.5).generate_columns(1000, start=0.0)
+    for key in ("id", "type", "severity", "location", "timestamp"):
+        assert (a[key] == b[key]).all()
+    assert a["severity"].min() >= 1 and a["severity"].max() <= 5
+
+
+def test_bulk_events_match_dict_schema():
+    env = Environment(seed=4, base_probability=1.0)
+    events = env.generate_events(50, interval=0.5, start=10.0)
+    assert len(events) == 50
+    assert len({e["id"] for e in events}) == 50
+    assert events[1]["timestamp"] - events[0]["timestamp"] == 0.5
+    assert set(events[0].keys()) == {"id", "type", "severity", "location", "timestamp"}
+
+
+def test_compact_events_behave_like_dicts():
+    import logging
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+
+    plain = Environment(seed=123, base_probability=1.0, clock=VirtualClock())
+    compact = Environment(seed=123, base_probability=1.0, clock=VirtualClock(), compact=True)
+    a, b = plain.generate_event(), compact.generate_event()
+    assert not hasattr(b, "__dict__")
+    assert isinstance(b["id"], int) and compact.generate_event().id == b.id + 1
+    assert {k: b[k] for k in ("type", "severity", "location")} == {k: a[k] for k in ("type", "severity", "location")}
+    assert dict(b) == b.to_dict() and b.get("missing", 0) == 0
+
+    clock = VirtualClock()
+    q = asyncio.Queue()
+    for ev in compact.generate_events(6, start=0.0):
+        q.put_nowait(ev)
+    agent = DisasterResponseAgent("A", q, logger=logging.getLogger("response_agent.test"), clock=clock)
+    clock.run(agent.run(cycles=6, timeout=0.5))
+    assert agent.events_processed == 6
+    goal = next(iter(agent.goals.goals))
+    assert isinstance(goal.event_id, int) and not hasattr(goal, "__dict__")
+
+
+def test_dispatcher_keeps_per_location_order():
+    from event_dispatcher import LocationDispatcher, shard_for
+
+    events = Environment(seed=9, base_probability=1.0).generate_events(200, start=0.0)
+    dispatcher = LocationDispatcher(3)
+    for ev in events:
+        dispatcher.put_nowait(ev)
+    assert dispatcher.qsize() == 200
+    for index, q in enumerate(dispatcher.queues):
+        shard = [q.get_nowait() for _ in range(q.qsize())]
+        assert all(shard_for(ev["location"], 3) == index for ev in shard)
+        expected = [ev for ev in events if shard_for(ev["location"], 3) == index]
+        assert shard == expected
+
+    # a dispatcher over a slice round-robins that slice, not global indexes
+    sliced = LocationDispatcher(2, locations=LOCATIONS[0::2])
+    for ev in events:
+        if ev["location"] in sliced.locations:
+            sliced.put_nowait(ev)
+    assert all(sliced.routed)
+
+
+def test_launcher_keeps_every_agent_busy():
+    from parallel_launcher import launch
+
+    with pytest.raises(ValueError):
+        launch(workers=len(LOCATIONS) + 1)
+    summary = launch(workers=2, agents_per_worker=2, duration=60.0, seed=1)
+    by_agent = summary["events_by_agent"]
+    assert sorted(by_agent) == ["ResponseAgent-1.1", "ResponseAgent-1.2",
+                                "ResponseAgent-2.1", "ResponseAgent-2.2"]
+    assert all(by_agent.values())
+    assert sum(by_agent.values()) == summary["events_processed"]
+
+
+def test_launcher_reports_a_worker_that_dies_silently(monkeypatch):
+    import os
+    import parallel_launcher
+
+    worker_main = parallel_launcher._worker_main
+
+    def dying(index, *args):
+        if index == 1:
+            os._exit(3)  # killed: no exception, no report
+        worker_main(index, *args)
+
+    monkeypatch.setattr(parallel_launcher, "_worker_main", dying)
+    with pytest.raises(RuntimeError, match="worker 1 exited with code 3"):
+        parallel_launcher.launch(workers=2, duration=1.0)
+
+
+def test_journal_round_trip_and_replay(tmp_path):
+    from event_journal import EventJournal, JournalReader, ReplayEnvironment
+    from sim_clock import VirtualClock
+
+    path = str(tmp_path / "events.evj")
+    env = Environment(seed=2, base_probability=1.0)
+    events = [env.generate_event() for _ in range(5)] + env.generate_events(5, start=env.clock.time())
+    events.sort(key=lambda e: e["timestamp"])
+    with EventJournal(path) as journal:
+        for ev in events:
+            journal.append(ev)
+    with JournalReader(path) as reader:
+        assert len(reader) == 10
+        assert list(reader) == events
+        assert reader[-1] == events[-1]
+
+    clock = VirtualClock()
+    q = asyncio.Queue()
+    clock.run(ReplayEnvironment(path, speed=1.0, clock=clock).run(q))
+    assert [q.get_nowait() for _ in range(q.qsize())] == events
+
+
+def test_journal_reopen_drops_torn_tail(tmp_path):
+    from event_journal import EventJournal, JournalReader, RECORD_SIZE
+
+    path = tmp_path / "events.evj"
+    events = Environment(seed=2, base_probability=1.0).generate_events(4, start=0.0)
+    with EventJournal(str(path)) as journal:
+        for ev in events[:2]:
+            journal.append(ev)
+    with open(path, "ab") as fh:  # crash mid-append
+        fh.write(b"\x01" * (RECORD_SIZE // 2))
+    with EventJournal(str(path)) as journal:
+        assert journal.count == 2
+        for ev in events[2:]:
+            journal.append(ev)
+    with JournalReader(str(path)) as reader:
+        assert list(reader) == events
+
+    (tmp_path / "other.bin").write_bytes(b"not a journal at all")
+    with pytest.raises(ValueError):
+        EventJournal(str(tmp_path / "other.bin"))
+
+
+def test_sensor_batch_drains_ready_events():
+    import logging
+    from agents.sensor_agent import SensorAgent
+
+    logger = logging.getLogger("sensor_agent.test")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    async def drain():
+        q = asyncio.Queue()
+        for ev in Environment(seed=1, base_probability=1.0).generate_events(10, start=0.0):
+            q.put_nowait(ev)
+        sensor = SensorAgent(q, logger=logger, echo=False)
+        first = await sensor.monitor_batch(max_batch=4, timeout=0.01)
+        await sensor.monitor(cycles=3, timeout=0.01, batch_size=4)
+        return first, sensor
+
+    first, sensor = asyncio.run(drain())
+    assert len(first) == 4
+    assert sensor.batch_stats.summary()["histogram"] == {2: 1, 4: 2}
+
+
+def test_agent_batch_logs_one_record_per_batch():
+    import logging
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+    from timer_wheel import TimerWheel
+
+    class Records(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    def run(batch_size, cycles):
+        handler = Records()
+        logger = logging.getLogger(f"response_agent.test_batch{batch_size}")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        clock = VirtualClock()
+        q = asyncio.Queue()
+        for ev in Environment(seed=4, base_probability=1.0).generate_events(10, start=0.0):
+            q.put_nowait(ev)
+        agent = DisasterResponseAgent("A", q, logger=logger, clock=clock)
+        clock.run(agent.run(cycles=cycles, timeout=0.01, batch_size=batch_size))
+        return handler.messages, agent
+
+    single, _ = run(1, cycles=10)
+    batched, agent = run(4, cycles=3)
+    assert agent.batch_stats.summary()["histogram"] == {4: 2, 2: 1}
+    # online, one record per batch, complete; same lines as unbatched
+    assert len(batched) == 2 + 3
+    assert [line for msg in batched for line in msg.split("\n")] == single
+
+    logger = logging.getLogger("response_agent.test_batch_modes")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    for kwargs in ({"workers": 2}, {"wheel": TimerWheel()}):
+        agent = DisasterResponseAgent("A", asyncio.Queue(), logger=logger, **kwargs)
+        with pytest.raises(ValueError):
+            asyncio.run(agent.run(batch_size=4))
+
+
+def test_bulk_generation_rejects_impossible_base_probability():
+    env = Environment(seed=1, base_probability=0.0)
+    assert env.generate_event() is None
+    with pytest.raises(ValueError, match="base_probability"):
+        env.generate_columns(3)
+
+
+def test_bulk_generation_without_numpy_names_the_dependency(monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "numpy", None)  # as if not installed
+    env = Environment(seed=1, base_probability=1.0)
+    assert env.generate_event() is not None  # the per-tick path needs no NumPy
+    with pytest.raises(ImportError, match="generate_columns needs NumPy"):
+        env.generate_events(3)
+
+
+def test_priority_queue_orders_by_severity_with_aging():
+    from event_queues import EventQueue
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+    q = EventQueue(order="priority", aging=10.0, clock=clock)
+    old_minor = {"id": "a", "severity": 1}
+    q.put_nowait(old_minor)
+    clock.advance(35)  # waited 3.5 levels' worth
+    for i, sev in enumerate([2, 5, 4]):
+        q.put_nowait({"id": f"n{i}", "severity": sev})
+    assert q.qsize() == 4
+    assert [q.get_nowait()["id"] for _ in range(4)] == ["n1", "a", "n2", "n0"]
+    assert q.empty()
+
+    fifo = EventQueue(order="fifo", clock=clock)
+    for i, sev in enumerate([3, 1, 5]):
+        fifo.put_nowait({"id": i, "severity": sev})
+    assert [fifo.get_nowait()["id"] for _ in range(3)] == [0, 1, 2]
+
+
+def test_bounded_queue_overflow_policies():
+    from event_queues import EventQueue
+    from response_metrics import Metrics
+
+    def fill(policy, severities, **kwargs):
+        metrics = Metrics()
+        q = EventQueue(maxsize=3, order="fifo", overflow=policy, metrics=metrics, **kwargs)
+        for i, sev in enumerate(severities):
+            q.put_nowait({"id": i, "severity": sev})
+        assert q.qsize() <= 3
+        return [q.get_nowait()["id"] for _ in range(q.qsize())], q, metrics
+
+    kept, q, metrics = fill("drop_oldest", [1, 2, 3, 4, 5])
+    assert kept == [2, 3, 4]
+    assert q.shed_counts == {"oldest": 2}
+    assert metrics.counter_value("events_dropped_total", reason="oldest") == 2
+
+    kept, q, _ = fill("drop_lowest", [2, 1, 3, 1, 5])
+    assert kept == [0, 2, 4]  # first sev-1 evicted for the 5, second sev-1 refused
+    assert q.dropped == 2
+
+    kept, q, _ = fill("sample", [1] * 3 + [2] * 6, sample_every=3)
+    assert kept == [2, 5, 8]
+    assert q.shed_counts == {"sampled": 6}
+
+    async def producer_never_blocks():
+        q = EventQueue(maxsize=2, overflow="drop_oldest")
+        for i in range(100):
+            await q.put({"id": i, "severity": 3})
+        return q.qsize(), q.dropped
+
+    assert asyncio.run(producer_never_blocks()) == (2, 98)
+
+
+def test_workload_models_hit_target_rate_and_replay():
+    from workload import Workload
+    from sim_clock import VirtualClock
+
+    # whole diurnal periods, so the cycle averages out to `rate`
+    stats = {m: Workload(seed=5, rate=4.0, model=m, duration=20000.0, period=2000.0).summary(bucket=10.0)
+             for m in ("poisson", "hawkes", "diurnal")}
+    for s in stats.values():
+        assert 3.8 < s["events_per_sec"] < 4.2
+    assert stats["poisson"]["dispersion"] < 1.5 < stats["hawkes"]["dispersion"]
+
+    wl = Workload(seed=2, rate=2.0, model="hawkes", duration=60.0,
+                  location_weights={"Nima": 3, "Teshie": 1})
+    cols = wl.schedule()
+    assert (cols["timestamp"][1:] >= cols["timestamp"][:-1]).all()
+    assert {e["location"] for e in wl.events()} <= {"Nima", "Teshie"}
+    assert (wl.schedule()["id"] == Workload(seed=2, rate=2.0, model="hawkes", duration=60.0,
+                                             location_weights={"Nima": 3, "Teshie": 1}).schedule()["id"]).all()
+
+    clock = VirtualClock()
+    q = asyncio.Queue()
+    clock.run(wl.replay(clock=clock).run(q))
+    assert q.qsize() == len(wl)
+
+
+def test_stream_analytics_matches_rescan_of_window():
+    from stream_analytics import StreamAnalytics
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+    analytics = StreamAnalytics(windows=(60, 300), buckets=60, clock=clock)
+    env = Environment(seed=11, base_probability=0.8, clock=clock)
+    seen = []
+    env.add_listener(analytics.observe)
+    env.add_listener(seen.append)
+
+    async def drain():
+        q = asyncio.Queue()
+        await env.run(q, interval=1.0, duration=900)
+
+    clock.run(drain())
+    now = clock.time()
+    for window in (60, 300):
+        width = window / 60
+        # the current bucket and the 59 before it: window - width <= span < window
+        recent = [e for e in seen if e["timestamp"] // width > now // width - 60]
+        assert analytics.count(window) == len(recent)
+        assert analytics.count(window, location="Nima") == sum(e["location"] == "Nima" for e in recent)
+        assert analytics.count(window, ev_type="fire") == sum(e["type"] == "fire" for e in recent)
+        assert analytics.count(window, "Circle", "flood") == sum(
+            e["location"] == "Circle" and e["type"] == "flood" for e in recent)
+        assert analytics.max_severity(window, "Teshie") == max(
+            [e["severity"] for e in recent if e["location"] == "Teshie"], default=0)
+    assert analytics.observed == len(seen)
+
+    clock.advance(301)  # everything slides out
+    assert analytics.count(300) == 0 and analytics.max_severity(300, "Nima") == 0
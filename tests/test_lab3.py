@@ -0,0 +1,566 @@
+import pytest
+
+from response_goals import Goal, GoalType, GoalSet, GoalStatus
+from response_fsm import State
+
+
+def test_active_goals_follow_status_and_priority_changes():
+    gs = GoalSet()
+    low = Goal(GoalType.ASSESS_DAMAGE, "Nima", 2, event_id="e1")
+    high = Goal(GoalType.RESCUE, "Circle", 5, event_id="e2")
+    gs.add_goal(low)
+    gs.add_goal(high)
+    assert gs.get_active_goals() == []
+
+    low.status = GoalStatus.ACTIVE
+    high.status = GoalStatus.ACTIVE
+    assert gs.get_active_goals() == [high, low]
+
+    low.priority = 5
+    assert gs.get_active_goals() == [low, high]
+    assert gs.pop_highest_active() is low
+    assert low.status == GoalStatus.COMPLETED
+    assert gs.highest_active() is high
+    assert gs.get_by_status(GoalStatus.COMPLETED) == [low]
+
+
+def test_lookup_by_event_and_location():
+    gs = GoalSet()
+    assess = Goal(GoalType.ASSESS_DAMAGE, "Teshie", 4, event_id="evt")
+    rescue = Goal(GoalType.RESCUE, "Teshie", 4, event_id="evt")
+    gs.add_goal(assess)
+    gs.add_goal(rescue)
+    assert gs.get_by_event_id("evt") == [assess, rescue]
+    assert gs.get_by_location("Teshie") == [assess, rescue]
+    assert gs.get_by_location("Madina") == []
+
+    stranger = Goal(GoalType.RESCUE, "Teshie", 4, event_id="evt")
+    gs.mark_failed(stranger)
+    assert stranger.status == GoalStatus.PENDING
+
+
+def test_terminal_goals_are_evicted_and_archived(tmp_path):
+    from response_archive import ArchiveWriter, read_archive
+
+    path = str(tmp_path / "goals.jsonl")
+    with ArchiveWriter(path) as archive:
+        gs = GoalSet(max_terminal=2, archive=archive)
+        goals = [Goal(GoalType.RESCUE, "Nima", 3, event_id=f"e{i}") for i in range(5)]
+        for g in goals:
+            gs.add_goal(g)
+            gs.mark_completed(g)
+    assert list(gs.goals) == goals[3:]
+    with pytest.raises(AttributeError):
+        gs.goals.append(goals[0])  # a read-only view, not the set's storage
+    assert gs.total_added == 5
+    assert gs.status_counts[GoalStatus.COMPLETED] == 5
+    assert [r["event_id"] for r in read_archive(path)] == ["e0", "e1", "e2"]
+    assert gs.get_by_event_id("e0") == []
+
+
+def test_goal_construction_skips_index_hook(monkeypatch):
+    # timing lives in benchmark.bench_goal_ops; this checks the hook is bypassed
+    hooked, reindexed = [], []
+    setattr_hook, reindex = Goal.__setattr__, GoalSet._reindex
+
+    def spy_setattr(goal, name, value):
+        hooked.append(name)
+        setattr_hook(goal, name, value)
+
+    def spy_reindex(gs, goal, name, old):
+        reindexed.append(name)
+        reindex(gs, goal, name, old)
+
+    monkeypatch.setattr(Goal, "__setattr__", spy_setattr)
+    monkeypatch.setattr(GoalSet, "_reindex", spy_reindex)
+    goal = Goal(GoalType.RESCUE, "Nima", 3, GoalStatus.ACTIVE, "e1", 0.0)
+    assert hooked == [] and goal.status == GoalStatus.ACTIVE and goal._owner is None
+
+    goal.status = GoalStatus.COMPLETED  # detached: a plain write
+    assert hooked == ["status"] and reindexed == []
+
+    gs = GoalSet()
+    gs.add_goal(goal)
+    goal.location = "Circle"  # not indexed
+    goal.priority = 5
+    assert reindexed == ["priority"]
+
+
+def test_fsm_history_limit_keeps_exact_counts():
+    from response_fsm import build_disaster_response_fsm, State
+
+    fsm = build_disaster_response_fsm(history_limit=3)
+    for _ in range(4):
+        for ev in ("event_detected", "assess_damage", "no_threat"):
+            fsm.handle_event(ev)
+    assert list(fsm.history) == [State.MONITORING, State.ASSESSING, State.IDLE]
+    # same type bounded or not, so callers need not special-case either
+    assert type(fsm.history) is type(build_disaster_response_fsm().history)
+    assert type(fsm.history) is type(build_disaster_response_fsm().compile().spawn().history)
+    assert fsm.transition_count == 12
+    assert fsm.state_counts[State.IDLE] == 5
+
+
+def quiet_logger():
+    import logging
+
+    logger = logging.getLogger("response_agent.test")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return logger
+
+
+def test_worker_pool_overlaps_incidents():
+    import asyncio
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from response_fsm import State
+    from sim_clock import VirtualClock
+
+    def run(workers):
+        clock = VirtualClock()
+        q = asyncio.Queue()
+        for ev in Environment(seed=8, base_probability=1.0).generate_events(12, start=0.0):
+            ev["severity"] = 5
+            q.put_nowait(ev)
+        agent = DisasterResponseAgent("A", q, logger=quiet_logger(), clock=clock, workers=workers)
+        clock.run(agent.run(cycles=12, timeout=0.5))
+        assert agent.goals.total_added == 24
+        assert not agent.incidents
+        assert agent.fsm.current_state == State.IDLE
+        return clock.time(), agent.stats()["state_visits"]
+
+    (pooled, pooled_visits), (sequential, sequential_visits) = run(4), run(1)
+    assert pooled < sequential / 3
+    assert pooled_visits == sequential_visits
+
+
+def test_worker_pool_drains_a_live_stream_like_sequential():
+    import asyncio
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+
+    def run(workers):
+        # demo_run's pipeline: idle workers time out together between events
+        clock = VirtualClock()
+        q = asyncio.Queue()
+        env = Environment(seed=42, base_probability=0.5, clock=clock)
+        agent = DisasterResponseAgent("A", q, logger=quiet_logger(), clock=clock, workers=workers)
+        emitted = []
+        env.add_listener(emitted.append)
+
+        async def pipeline():
+            await asyncio.gather(env.run(q, interval=0.3, duration=30),
+                                 agent.run(cycles=int(30 / 0.3) + 3, timeout=0.35))
+
+        clock.run(pipeline())
+        return len(emitted), agent.events_processed, q.qsize()
+
+    emitted, processed, left = run(1)
+    assert processed == emitted and left == 0
+    assert run(4) == (emitted, emitted, 0)
+
+
+def test_async_logging_writes_batches_in_order(tmp_path):
+    import logging
+    import queue
+    from log_pipeline import BatchingQueueListener, attach_handlers, stop_listener, _listeners
+
+    path = tmp_path / "events.log"
+    logger = logging.getLogger("response_agent.test_async")
+    logger.propagate = False
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    attach_handlers(logger, [handler], async_mode=True, batch_size=16)
+    listener = _listeners[logger.name]
+    for i in range(100):
+        logger.warning("[%s] line %d", "A", i)
+    stop_listener(logger)
+    handler.close()
+    assert path.read_text().splitlines() == [f"[A] line {i}" for i in range(100)]
+    assert 1 <= listener.batches_written <= 100
+
+    # with the whole backlog queued before the listener starts, every batch
+    # but the last is full
+    q = queue.SimpleQueue()
+    for i in range(100):
+        q.put(logging.LogRecord("t", logging.WARNING, __file__, 0, "line %d", (i,), None))
+    sink = logging.FileHandler(tmp_path / "batched.log")
+    listener = BatchingQueueListener(q, sink, batch_size=16)
+    listener.start()
+    listener.stop()
+    sink.close()
+    assert listener.batches_written == 7  # ceil(100 / 16)
+    assert (tmp_path / "batched.log").read_text().splitlines() == [f"line {i}" for i in range(100)]
+
+
+def test_async_rotation_counts_buffered_bytes(tmp_path):
+    import logging
+    from logging.handlers import RotatingFileHandler
+    from log_pipeline import attach_handlers, stop_listener
+
+    path = tmp_path / "events.log"
+    logger = logging.getLogger("response_agent.test_rotation")
+    logger.propagate = False
+    handler = RotatingFileHandler(path, maxBytes=4000, backupCount=20)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    attach_handlers(logger, [handler], async_mode=True, batch_size=256)
+    for i in range(1000):
+        logger.warning("[%s] line %04d", "A", i)
+    stop_listener(logger)
+    handler.close()
+    record = len("[A] line 0000\n")
+    backups = sorted(tmp_path.glob("events.log.*"), key=lambda f: int(f.suffix[1:]))
+    files = backups[::-1] + [path]  # oldest first
+    assert len(files) > 3
+    assert all(f.stat().st_size <= 4000 + record for f in files)
+    lines = [line for f in files for line in f.read_text().splitlines()]
+    assert lines == [f"[A] line {i:04d}" for i in range(1000)]
+
+
+def test_compiled_fsm_matches_interpreted():
+    from response_fsm import build_disaster_response_fsm, State
+
+    script = ["event_detected", "bogus", "assess_damage", "damage_confirmed",
+              "goal_complete", "recovery_done", "event_detected", "assess_damage", "no_threat"]
+    plain = build_disaster_response_fsm()
+    compiled = build_disaster_response_fsm().compile()
+    entered = []
+    compiled.on_enter(State.RESPONDING, lambda ctx: entered.append(ctx))
+    results = [(plain.handle_event(e), compiled.handle_event(e)) for e in script]
+    assert all(a == b for a, b in results)
+    assert compiled.history == plain.history
+    assert entered == [{}]
+
+    twin = compiled.spawn()
+    assert twin.current_state == State.IDLE and list(twin.history) == [State.IDLE]
+    assert twin.fire(compiled.event_ids["event_detected"])
+    assert compiled.current_state == State.IDLE
+
+
+def test_batch_fsm_matches_individual_machines():
+    import numpy as np
+    from fsm_batch import BatchFSM
+    from response_fsm import build_disaster_response_fsm
+
+    template = build_disaster_response_fsm().compile()
+    fleet = BatchFSM(template, machines=50)
+    singles = [template.spawn() for _ in range(50)]
+    entered = []
+    fleet.on_enter_batch(State.RESPONDING, lambda idx: entered.extend(idx.tolist()))
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        events = rng.integers(-1, len(template.event_ids), 50)
+        moved = fleet.step(events)
+        for i, fsm in enumerate(singles):
+            assert moved[i] == (events[i] >= 0 and fsm.fire(int(events[i])))
+    assert [fleet.state_of(i) for i in range(50)] == [f.current_state for f in singles]
+    assert fleet.transition_count == sum(f.transition_count for f in singles)
+    assert len(entered) == sum(f.state_counts[State.RESPONDING] for f in singles)
+    # an unknown id is an error, not an idle step
+    n_events = len(template.event_ids)
+    for bad in (n_events, np.full(50, n_events), [0] * 49 + [n_events + 3]):
+        with pytest.raises(ValueError):
+            fleet.step(bad)
+    assert fleet.transition_count == sum(f.transition_count for f in singles)
+
+
+def test_metrics_cover_queue_states_and_goals():
+    import asyncio
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from response_metrics import Metrics
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+    metrics = Metrics()
+
+    async def pipeline():
+        q = asyncio.Queue()
+        env = Environment(seed=3, base_probability=0.5, clock=clock, metrics=metrics)
+        agent = DisasterResponseAgent("A", q, logger=quiet_logger(), clock=clock, metrics=metrics)
+        await asyncio.gather(env.run(q, interval=0.3, duration=30), agent.run(cycles=103, timeout=0.35))
+        return agent
+
+    agent = clock.run(pipeline())
+    emitted = sum(v for (name, _), v in metrics.counters.items() if name == "events_emitted_total")
+    assert metrics.histogram("queue_wait_seconds", agent="A").count == agent.events_processed == emitted
+    assert abs(metrics.histogram("state_dwell_seconds", state="assessing").sum
+               - agent.state_dwell[State.ASSESSING]) < 1e-9
+    assert metrics.histogram("goal_completion_seconds", type="assess_damage").max <= 0.1 + 1e-9
+    # the producer's backlog and the consumer's view are separate gauges
+    assert set(metrics.snapshot()["gauges"]) == {"producer_queue_depth", 'consumer_queue_depth{agent="A"}'}
+    text = metrics.to_prometheus()
+    assert "# TYPE queue_wait_seconds histogram" in text
+    assert 'state_dwell_seconds_bucket{state="idle",le="+Inf"}' in text
+
+
+def test_coalescing_merges_repeats_within_window():
+    import asyncio
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+
+    def event(i, severity, location="Nima"):
+        return {"id": f"e{i}", "type": "flood", "severity": severity,
+                "location": location, "timestamp": clock.time()}
+
+    async def scenario(agent):
+        await agent.process_event(event(1, 3))
+        assert agent.goals.get_active_goals() == []
+        await agent.process_event(event(2, 5))            # merged, escalates priority
+        await agent.process_event(event(3, 2, "Circle"))  # different key
+        await clock.sleep(120)
+        await agent.process_event(event(4, 3))            # window expired
+
+    agent = DisasterResponseAgent("A", asyncio.Queue(), logger=quiet_logger(), clock=clock,
+                                  coalesce_window=60)
+    clock.run(scenario(agent))
+    assert agent.incident_cache.merged == 1
+    assert [g.event_id for g in agent.goals.goals] == ["e1", "e1", "e3", "e4", "e4"]
+    assert [g.priority for g in agent.goals.get_by_event_id("e1")] == [5, 5]
+    assert agent.stats()["events_coalesced"] == 1
+
+
+def test_experiment_rows_do_not_depend_on_worker_count(tmp_path):
+    import csv
+    from experiments import COLUMNS, grid, run_experiments
+
+    trials = grid(range(2), base_probabilities=(0.4, 0.8), agent_counts=(1, 2), duration=60.0)
+    serial = list(run_experiments(trials, workers=1, output=str(tmp_path / "a.csv")))
+    parallel = list(run_experiments(trials, workers=2, output=str(tmp_path / "b.csv")))
+    assert serial == parallel
+    assert (tmp_path / "a.csv").read_bytes() == (tmp_path / "b.csv").read_bytes()
+    rows = list(csv.DictReader(open(tmp_path / "a.csv")))
+    assert len(rows) == 8 and list(rows[0]) == list(COLUMNS)
+    assert all(r["rescues"] <= r["goals_total"] for r in serial)
+    assert serial[0]["goals_total"] > 0 and serial[0]["dwell_assessing"] > 0
+
+
+def test_timer_wheel_batches_and_wheel_mode_matches_workers():
+    import asyncio
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+    from timer_wheel import TimerWheel
+
+    clock = VirtualClock()
+    wheel = TimerWheel(tick=0.1, slots=4, clock=clock)
+    fired = []
+
+    async def schedule():
+        for delay in (0.05, 0.1, 0.1, 0.25, 0.75):  # 0.75 wraps the 4-slot wheel
+            wheel.schedule(delay, lambda d=delay: fired.append((d, round(clock.time(), 3))))
+        wheel.schedule(0.2, fired.append, "cancelled").cancel()
+        await wheel.wait_idle()
+
+    clock.run(schedule())
+    assert fired == [(0.05, 0.1), (0.1, 0.1), (0.1, 0.1), (0.25, 0.3), (0.75, 0.8)]
+    assert wheel.max_batch == 3 and wheel.pending == 0
+
+    def run(wheel_mode):
+        clock = VirtualClock()
+        q = asyncio.Queue()
+        for ev in Environment(seed=8, base_probability=1.0).generate_events(40, start=0.0):
+            q.put_nowait(ev)
+        agent = DisasterResponseAgent("A", q, logger=quiet_logger(), clock=clock, workers=8,
+                                      wheel=TimerWheel(clock=clock) if wheel_mode else None)
+        clock.run(agent.run(cycles=40, timeout=0.5))
+        assert not agent.incidents
+        stats = agent.stats()
+        del stats["agent_id"]
+        return stats, agent.state_dwell
+
+    (wheel_stats, wheel_dwell), (worker_stats, worker_dwell) = run(True), run(False)
+    assert wheel_stats == worker_stats
+    assert {s: round(v, 6) for s, v in wheel_dwell.items()} == {s: round(v, 6) for s, v in worker_dwell.items()}
+
+
+def test_wheel_phase_error_aborts_only_its_incident():
+    import asyncio
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+    from timer_wheel import TimerWheel
+
+    clock = VirtualClock()
+    q = asyncio.Queue()
+    events = Environment(seed=8, base_probability=1.0).generate_events(10, start=0.0)
+    for ev in events:
+        q.put_nowait(ev)
+    agent = DisasterResponseAgent("A", q, logger=quiet_logger(), clock=clock, workers=4,
+                                  wheel=TimerWheel(clock=clock))
+    assessed = agent._assessed
+
+    def flaky(fsm, work):
+        if work.event is events[0]:
+            raise RuntimeError("assessment service down")
+        assessed(fsm, work)
+
+    agent._assessed = flaky
+    clock.run(asyncio.wait_for(agent.run(cycles=10, timeout=0.5), 60))
+    assert not agent.incidents and not agent.in_flight
+    assert agent.stats()["incidents_failed"] == 1
+    assert [g.status for g in agent.goals.get_by_event_id(events[0]["id"])] == [GoalStatus.FAILED]
+    assert agent.events_processed == 10
+
+
+def test_checkpoint_restores_state_and_requeues_unfinished_work(tmp_path):
+    import asyncio
+    from collections import Counter
+    from checkpoint import Checkpointer, load_checkpoint, read_frames, restore, resume
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from event_journal import EventJournal
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+    journal_path, ckpt_path = str(tmp_path / "events.evj"), str(tmp_path / "agent.ckpt")
+    events = Environment(seed=5, base_probability=1.0).generate_events(30, start=0.0)
+    q = asyncio.Queue()
+    with EventJournal(journal_path) as journal:
+        for ev in events:
+            journal.append(ev)
+    for ev in events[:20]:
+        q.put_nowait(ev)
+    agent = DisasterResponseAgent("A", q, logger=quiet_logger(), clock=clock, retention=5)
+    cp = Checkpointer(agent, ckpt_path, interval=0.4, full_every=5)
+
+    async def crash():
+        task = asyncio.ensure_future(agent.run(cycles=20, timeout=0.5))
+        snapshots = asyncio.ensure_future(cp.run(duration=2.0))
+        await clock.sleep(3.15)
+        expected = (agent.fsm.transition_count, Counter(agent.fsm.state_counts), list(agent.fsm.history),
+                    [g.event_id for g in agent.goals.goals], agent.goals.total_added,
+                    agent.events_processed, agent.events_dequeued, list(agent.in_flight.values()))
+        await cp.checkpoint()
+        task.cancel()  # the agent dies mid-incident right after the last snapshot
+        await asyncio.gather(task, snapshots, return_exceptions=True)
+        return expected
+
+    (transitions, state_counts, history, goal_events, total_added, processed, dequeued,
+     in_flight) = clock.run(crash())
+    cp.close()
+    kinds = [frame["kind"] for frame in read_frames(ckpt_path)]
+    assert kinds[0] == "base" and "delta" in kinds
+    assert len(in_flight) == 1
+    interrupted = in_flight[0]
+
+    fresh = DisasterResponseAgent("A", asyncio.Queue(), logger=quiet_logger(), clock=VirtualClock(),
+                                  retention=5)
+    attached = Checkpointer(fresh, str(tmp_path / "again.ckpt"))  # set up before resuming
+    attached.snapshot()  # its base; the next snapshot is a delta
+    queued = resume(fresh, ckpt_path, journal_path=journal_path)
+    assert queued == 1 + 30 - dequeued
+    assert fresh.queue.get_nowait() == interrupted
+    assert fresh.queue.get_nowait() == events[dequeued]
+    assert fresh.events_processed == processed - 1
+    assert fresh.fsm.current_state == State.IDLE
+    assert fresh.fsm.transition_count == transitions
+    assert fresh.fsm.state_counts == state_counts
+    assert list(fresh.fsm.history) == history
+    # failing the interrupted goal retires it, evicting the oldest terminal goal
+    assert [g.event_id for g in fresh.goals.goals] == goal_events[1:]
+    assert fresh.goals.total_added == total_added
+    interrupted_goals = fresh.goals.get_by_event_id(interrupted["id"])
+    assert interrupted_goals and all(g.status == GoalStatus.FAILED for g in interrupted_goals)
+    # the restored goal set still reports changes to the attached checkpointer
+    added = Goal(GoalType.RESCUE, "Nima", 3)
+    fresh.goals.add_goal(added)
+    delta, base = attached.snapshot()
+    assert not base and added._seq in [record[0] for record in delta["goals"]]
+    attached.close()
+
+    # restore() alone leaves the counters consistent
+    bare = DisasterResponseAgent("A", asyncio.Queue(), logger=quiet_logger(), clock=VirtualClock(),
+                                 retention=5)
+    restore(bare, load_checkpoint(ckpt_path))
+    assert (bare.events_processed, bare.events_dequeued) == (processed - 1, dequeued - 1)
+
+
+def test_checkpoint_run_writes_final_frame_when_cancelled(tmp_path):
+    import asyncio
+    from checkpoint import Checkpointer, load_checkpoint
+    from disaster_response_agent import DisasterResponseAgent
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock()
+    agent = DisasterResponseAgent("A", asyncio.Queue(), logger=quiet_logger(), clock=clock)
+    cp = Checkpointer(agent, str(tmp_path / "agent.ckpt"), interval=1.0)
+
+    async def main():
+        task = asyncio.ensure_future(cp.run())
+        await clock.sleep(2.5)
+        agent.events_processed = 7  # changed after the last periodic snapshot
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    clock.run(main())
+    cp.close()
+    assert cp.snapshots == 3
+    assert load_checkpoint(cp.path)["agent"]["events_processed"] == 7
+
+
+def test_log_analysis_rebuilds_timelines_across_rotated_files(tmp_path):
+    import asyncio
+    import logging
+    from logging.handlers import RotatingFileHandler
+    from agents.sensor_agent import SensorAgent
+    from disaster_environment import Environment
+    from disaster_response_agent import DisasterResponseAgent
+    from log_analysis import ALERT, SENSOR_EVENT, parse_logs, rotated_files, TimelineBuilder
+    from sim_clock import VirtualClock
+
+    clock = VirtualClock(start=1_700_000_000.0)
+
+    def stamp(record):  # asctime follows the simulated clock
+        record.created = clock.time()
+        record.msecs = (record.created % 1) * 1000
+        return True
+
+    path = str(tmp_path / "response_events")
+    handler = RotatingFileHandler(path, maxBytes=4000, backupCount=50)
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    handler.addFilter(stamp)
+    logger = logging.getLogger("response_agent.test_log_analysis")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    events = Environment(seed=3, base_probability=1.0).generate_events(40, start=clock.time())
+    sensor_q, agent_q = asyncio.Queue(), asyncio.Queue()
+    for ev in events:
+        sensor_q.put_nowait(ev)
+        agent_q.put_nowait(ev)
+    sensor = SensorAgent(sensor_q, logger=logger, clock=clock, echo=False)
+    agent = DisasterResponseAgent("A", agent_q, logger=logger, clock=clock, coalesce_window=2.0)
+
+    async def run():
+        await sensor.monitor_batch(max_batch=10)
+        await agent.run(cycles=40, timeout=0.5)
+
+    clock.run(run())
+    handler.close()
+    assert len(rotated_files(path)) > 2
+
+    records = list(parse_logs(path))
+    sensed = [r for r in records if r.kind == SENSOR_EVENT]
+    assert [r.event_id for r in sensed] == [str(ev["id"]) for ev in events[:10]]
+    assert sum(r.kind == ALERT for r in records) == 40
+
+    builder = TimelineBuilder(keep=True).feed(records)
+    stats = agent.stats()
+    rescues = stats["goals_by_type"].get("rescue", 0)
+    assert builder.unmatched == 0 and builder.open_incidents == 0
+    assert builder.closed + builder.merged == 40
+    assert builder.closed == stats["goals_by_type"]["assess_damage"]
+    assert sum(t.outcome == "rescue" for t in builder.timelines) == rescues
+    assert builder.dispatch_seconds.count == rescues
+    assert abs(builder.dispatch_seconds.max - agent.ASSESS_DELAY) < 0.002
+    rescue = next(t for t in builder.timelines if t.outcome == "rescue")
+    assert [label for _, label in rescue.entries] == [
+        "alert", "monitoring", "plan", "assessing", "responding", "damage_confirmed", "recovering", "idle"]
+    assert abs(rescue.duration - 0.25) < 0.002
@@ -0,0 +1,125 @@
+"""Hashed timer wheel for simulated phase delays
+
+Awaiting asyncio.sleep per incident phase costs one heap-scheduled timer
+handle plus a suspended coroutine frame per open incident, and the loop
+pays O(log n) per timer. TimerWheel instead hashes each deadline into one
+of `slots` buckets of `tick` seconds. One driver task wakes once per tick
+and fires every timer due in that tick as a batch, so scheduling is an
+O(1) append and firing is proportional to the timers due, whatever the
+number of open timers.
+
+Deadlines are rounded up to the tick grid (a timer never fires early, at
+most one tick late). Delays longer than slots * tick wrap around the
+wheel and wait for their round. The driver task only exists while timers
+are pending, so an idle wheel costs nothing.
+"""
+
+import asyncio
+import math
+from typing import Callable, List, Optional
+
+from sim_clock import Clock, REAL_CLOCK
+
+
+class Timer:
+    """Handle for a scheduled callback."""
+    __slots__ = ("due", "callback", "args", "cancelled")
+
+    def __init__(self, due: int, callback: Callable, args: tuple):
+        self.due = due
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Batching timer service driven by a clock.
+
+    tick: wheel resolution in seconds
+    slots: buckets per revolution
+    """
+
+    def __init__(self, tick: float = 0.05, slots: int = 512, clock: Optional[Clock] = None):
+        if tick <= 0 or slots < 1:
+            raise ValueError("tick must be > 0 and slots >= 1")
+        self.tick = tick
+        self.clock = clock or REAL_CLOCK
+        self._slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self._origin = 0.0
+        self._current = 0  # last tick fired
+        self._pending = 0
+        self._task: Optional[asyncio.Task] = None
+        self._idle: Optional[asyncio.Event] = None
+        self.batches = 0  # ticks that fired at least one timer
+        self.fired = 0
+        self.max_batch = 0
+
+    @property
+    def pending(self) -> int:
+        """Timers scheduled and not yet fired (cancelled ones included)."""
+        return self._pending
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """Call `callback(*args)` once `delay` seconds have passed.
+
+        Must be called from a running event loop.
+        """
+        now = self.clock.time()
+        if self._task is None:
+            # restart the grid from now when the wheel has been idle
+            self._origin = now
+            self._current = 0
+            self._idle = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._drive())
+        due = max(self._current + 1, math.ceil((now + delay - self._origin) / self.tick - 1e-9))
+        timer = Timer(due, callback, args)
+        self._slots[due % len(self._slots)].append(timer)
+        self._pending += 1
+        return timer
+
+    async def wait_idle(self) -> None:
+        """Wait until every scheduled timer has fired."""
+        if self._task is not None:
+            await self._idle.wait()
+
+    async def _drive(self) -> None:
+        try:
+            while self._pending:
+                self._current += 1
+                delay = self._origin + self._current * self.tick - self.clock.time()
+                if delay > 0:
+                    await self.clock.sleep(delay)
+                self._fire(self._current)
+        finally:
+            self._task = None
+            self._idle.set()
+
+    def _fire(self, tick: int) -> None:
+        index = tick % len(self._slots)
+        bucket = self._slots[index]
+        if not bucket:
+            return
+        due = [t for t in bucket if t.due <= tick]
+        if not due:  # only timers for a later revolution
+            return
+        if len(due) < len(bucket):
+            self._slots[index] = [t for t in bucket if t.due > tick]
+        else:
+            self._slots[index] = []
+        self._pending -= len(due)
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(due))
+        for timer in due:
+            if timer.cancelled:
+                continue
+            self.fired += 1
+            try:
+                timer.callback(*timer.args)
+            except Exception as exc:
+                asyncio.get_running_loop().call_exception_handler({
+                    "message": "TimerWheel callback failed",
+                    "exception": exc,
+                })
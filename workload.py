@@ -0,0 +1,214 @@
+"""Trace-driven workload generation
+
+Environment flips one coin per `interval`, which gives evenly spread,
+memoryless arrivals. Workload precomputes a whole schedule up front from
+an arrival model and a target rate in events/sec, so generation costs no
+per-tick work. The schedule is then replayed through ReplayEnvironment.
+
+Arrival models:
+
+  poisson   homogeneous Poisson process at `rate`
+  hawkes    self-exciting bursts (aftershocks, flood cascades): background
+            events arrive as Poisson, and each event spawns on average
+            `branching` follow-ups after Exp(`decay`) delays. Follow-ups
+            keep the type and location of their parent with equal or
+            lower severity. The long-run rate is still `rate`.
+  diurnal   Poisson with a daily cycle: the rate swings by +/- `amplitude`
+            around `rate` and peaks at `peak` seconds into the `period`
+
+Locations and severities are drawn from optional weights (uniform by
+default). Schedules use the generate_columns layout, so the same
+columns_to_events / EventJournal tooling applies:
+
+  wl = Workload(seed=1, rate=5.0, model="hawkes", duration=3600)
+  env = wl.replay(clock=clock)        # drop-in for Environment.run
+"""
+
+from typing import Dict, Iterator, Optional, Sequence
+
+from disaster_environment import EVENT_TYPES, LOCATION_CODES, LOCATIONS, columns_to_events, import_numpy
+from event_journal import ReplayEnvironment
+from sim_clock import Clock
+
+MODELS = ("poisson", "hawkes", "diurnal")
+
+
+def poisson_times(rng, rate: float, duration: float):
+    """Arrival offsets in [0, duration) of a Poisson process, unsorted."""
+    n = rng.poisson(rate * duration)
+    return rng.uniform(0.0, duration, n)
+
+
+def diurnal_times(rng, rate: float, duration: float, amplitude: float = 0.8,
+                  period: float = 86400.0, peak: float = 14 * 3600.0):
+    """Arrival offsets of a Poisson process with a cosine daily cycle.
+
+    Candidates are drawn at the peak rate and thinned to the rate at
+    their own time of day.
+    """
+    np = import_numpy("workload")
+
+    peak_rate = rate * (1 + amplitude)
+    times = poisson_times(rng, peak_rate, duration)
+    current = rate * (1 + amplitude * np.cos(2 * np.pi * (times - peak) / period))
+    return times[rng.uniform(0.0, peak_rate, len(times)) < current]
+
+
+def hawkes_times(rng, rate: float, duration: float, branching: float = 0.6,
+                 decay: float = 1.0):
+    """Arrival offsets and parent indexes of a Hawkes process.
+
+    Uses the cluster (branching) representation: Poisson immigrants at
+    rate * (1 - branching), then generation by generation each event gets
+    Poisson(branching) children after Exp(decay) delays. Returns
+    (times, parents) where parents[i] is the index of the event that
+    triggered event i, or -1 for background events.
+    """
+    np = import_numpy("workload")
+
+    if not 0 <= branching < 1:
+        raise ValueError("branching must be in [0, 1) for a stable process")
+    times = [poisson_times(rng, rate * (1 - branching), duration)]
+    parents = [np.full(len(times[0]), -1, dtype=np.int64)]
+    offset = 0
+    generation = times[0]
+    while len(generation):
+        counts = rng.poisson(branching, len(generation))
+        parent = np.repeat(np.arange(offset, offset + len(generation)), counts)
+        child = np.repeat(generation, counts) + rng.exponential(1 / decay, counts.sum())
+        keep = child < duration
+        offset += len(generation)
+        generation = child[keep]
+        times.append(generation)
+        parents.append(parent[keep])
+    return np.concatenate(times), np.concatenate(parents)
+
+
+def _weights(names: Sequence[str], weights: Optional[Dict[str, float]]):
+    np = import_numpy("workload")
+
+    if weights is None:
+        return None
+    p = np.array([float(weights.get(name, 0.0)) for name in names])
+    if p.sum() <= 0:
+        raise ValueError("weights must give some location a positive weight")
+    return p / p.sum()
+
+
+class Workload:
+    """Precomputed event schedule for one arrival model.
+
+    seed: seed for the NumPy generator (same seed, same schedule)
+    rate: target events per second (long-run average for every model)
+    model: one of MODELS
+    duration: schedule length in seconds
+    start: timestamp of offset 0
+    locations: locations to draw from (default all LOCATIONS)
+    location_weights: optional {location: weight}
+    severity_weights: optional five weights for severities 1..5
+    hawkes / diurnal: model parameters, see hawkes_times / diurnal_times
+    """
+
+    def __init__(self, seed: Optional[int] = None, rate: float = 1.0, model: str = "poisson",
+                 duration: float = 3600.0, start: float = 0.0,
+                 locations: Optional[Sequence[str]] = None,
+                 location_weights: Optional[Dict[str, float]] = None,
+                 severity_weights: Optional[Sequence[float]] = None,
+                 branching: float = 0.6, decay: float = 1.0,
+                 amplitude: float = 0.8, period: float = 86400.0, peak: float = 14 * 3600.0):
+        if model not in MODELS:
+            raise ValueError(f"model must be one of {MODELS}")
+        self.seed = seed
+        self.rate = rate
+        self.model = model
+        self.duration = duration
+        self.start = start
+        self.locations = list(locations) if locations is not None else LOCATIONS
+        self.location_weights = location_weights
+        self.severity_weights = severity_weights
+        self.branching = branching
+        self.decay = decay
+        self.amplitude = amplitude
+        self.period = period
+        self.peak = peak
+        self._columns = None
+
+    def schedule(self) -> Dict:
+        """The schedule as generate_columns-style NumPy columns, sorted by
+        timestamp. Computed once and cached."""
+        if self._columns is None:
+            self._columns = self._build()
+        return self._columns
+
+    def _build(self) -> Dict:
+        np = import_numpy("workload")
+
+        rng = np.random.default_rng(self.seed)
+        parents = None
+        if self.model == "poisson":
+            times = poisson_times(rng, self.rate, self.duration)
+        elif self.model == "diurnal":
+            times = diurnal_times(rng, self.rate, self.duration, self.amplitude, self.period, self.peak)
+        else:
+            times, parents = hawkes_times(rng, self.rate, self.duration, self.branching, self.decay)
+        n = len(times)
+
+        codes = np.array([LOCATION_CODES[loc] for loc in self.locations], dtype=np.uint8)
+        location = codes[rng.choice(len(codes), n, p=_weights(self.locations, self.location_weights))]
+        ev_type = rng.integers(0, len(EVENT_TYPES), n, dtype=np.uint8)
+        sev_p = None
+        if self.severity_weights is not None:
+            sev_p = np.asarray(self.severity_weights, dtype=float) / sum(self.severity_weights)
+        severity = rng.choice(np.arange(1, 6, dtype=np.uint8), n, p=sev_p)
+
+        if parents is not None:
+            # parents always precede their children in generation order, so
+            # one forward pass copies type/location down whole cascades
+            weaker = rng.integers(0, 2, n).astype(np.uint8)
+            for i in np.flatnonzero(parents >= 0).tolist():
+                p = parents[i]
+                location[i] = location[p]
+                ev_type[i] = ev_type[p]
+                severity[i] = max(1, severity[p] - weaker[i])
+
+        order = np.argsort(times, kind="stable")
+        return {
+            "id": np.arange(n, dtype=np.int64),
+            "type": ev_type[order],
+            "severity": severity[order],
+            "location": location[order],
+            "timestamp": self.start + times[order],
+        }
+
+    def __len__(self) -> int:
+        return len(self.schedule()["id"])
+
+    def events(self, compact: bool = False) -> Iterator:
+        """Iterate the schedule as event dicts (or Events when compact)."""
+        return columns_to_events(self.schedule(), compact=compact)
+
+    def replay(self, clock: Optional[Clock] = None, speed: Optional[float] = 1.0,
+               compact: bool = False, retime: bool = False) -> ReplayEnvironment:
+        """ReplayEnvironment that releases the schedule on `clock`."""
+        return ReplayEnvironment(self.events(compact), speed=speed, clock=clock, retime=retime)
+
+    def summary(self, bucket: float = 1.0) -> Dict:
+        """Achieved rate and burstiness (variance/mean of per-bucket counts,
+        1.0 for Poisson, larger when arrivals cluster)."""
+        np = import_numpy("workload")
+
+        ts = self.schedule()["timestamp"] - self.start
+        counts = np.bincount((ts // bucket).astype(np.int64), minlength=int(self.duration // bucket) or 1)
+        mean = counts.mean()
+        return {
+            "model": self.model,
+            "events": int(len(ts)),
+            "events_per_sec": len(ts) / self.duration if self.duration else 0.0,
+            "dispersion": float(counts.var() / mean) if mean else 0.0,
+            "peak_per_bucket": int(counts.max()) if len(counts) else 0,
+        }
+
+
+if __name__ == "__main__":
+    for model in MODELS:
+        print(Workload(seed=1, rate=5.0, model=model, duration=86400.0).summary(bucket=10.0))